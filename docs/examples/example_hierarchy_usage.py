@@ -5,70 +5,102 @@ Demonstrates how to use the relative_input_path parameter
 to control output directory structure when processing PDFs.
 """
 
-import requests
-import json
+import asyncio
+import aiohttp
+from contextlib import nullcontext
 from pathlib import Path
 
 # API configuration
 API_BASE_URL = "http://localhost:8000"
 
-def upload_with_hierarchy(file_path: str, relative_input_path: str = None):
+async def upload_with_hierarchy(
+    session: aiohttp.ClientSession,
+    file_path: str,
+    relative_input_path: str = None,
+    pdf_bytes: bytes = None,
+):
     """
     Upload a PDF file with optional hierarchy preservation
     
     Args:
+        session: Shared aiohttp session (reuses keep-alive connections)
         file_path: Path to the PDF file
         relative_input_path: Relative path to preserve in output structure
+        pdf_bytes: File contents already read by the caller (skips reopening the file)
     
     Returns:
         Document ID if successful, None if failed
     """
     
-    if not Path(file_path).exists():
+    if pdf_bytes is None and not Path(file_path).exists():
         print(f"❌ File not found: {file_path}")
         return None
     
-    # Prepare request
-    files = {'file': open(file_path, 'rb')}
-    data = {
-        'language': 'vie',
-        'enable_handwriting_detection': False
-    }
-    
     # Add relative path if specified
     if relative_input_path:
-        data['relative_input_path'] = relative_input_path
         print(f"📁 Uploading {file_path} with hierarchy: {relative_input_path}")
     else:
         print(f"📁 Uploading {file_path} (default behavior)")
     
     try:
-        response = requests.post(f"{API_BASE_URL}/documents/transform", files=files, data=data)
-        files['file'].close()
-        
-        if response.status_code == 200:
-            result = response.json()
-            document_id = result['document_id']
-            print(f"✅ Upload successful! Document ID: {document_id}")
-            
-            # Show expected output location
-            filename_base = Path(file_path).stem
+        # The with block closes the file even if the request raises
+        with open(file_path, 'rb') if pdf_bytes is None else nullcontext(pdf_bytes) as content:
+            # Prepare request
+            data = aiohttp.FormData()
+            data.add_field('file', content, filename=Path(file_path).name, content_type='application/pdf')
+            data.add_field('language', 'vie')
+            data.add_field('enable_handwriting_detection', 'false')
             if relative_input_path:
-                expected_output = f"output/{relative_input_path}/{filename_base}/"
-            else:
-                expected_output = f"output/{filename_base}/"
-            print(f"📂 Expected output location: {expected_output}")
+                data.add_field('relative_input_path', relative_input_path)
             
-            return document_id
+            async with session.post(f"{API_BASE_URL}/documents/transform", data=data) as response:
+                if response.status != 200:
+                    print(f"❌ Upload failed: {response.status}")
+                    print(f"Response: {await response.text()}")
+                    return None
+                result = await response.json()
+        
+        document_id = result['document_id']
+        print(f"✅ Upload successful! Document ID: {document_id}")
+        
+        # Show expected output location
+        filename_base = Path(file_path).stem
+        if relative_input_path:
+            expected_output = f"output/{relative_input_path}/{filename_base}/"
         else:
-            print(f"❌ Upload failed: {response.status_code}")
-            print(f"Response: {response.text}")
-            return None
+            expected_output = f"output/{filename_base}/"
+        print(f"📂 Expected output location: {expected_output}")
+        
+        return document_id
             
     except Exception as e:
         print(f"❌ Error during upload: {e}")
         return None
 
+async def upload_batch(files: list):
+    """
+    Upload several files concurrently over one pool of keep-alive connections
+    
+    Args:
+        files: List of {"path": ..., "relative_path": ...} dicts
+    
+    Returns:
+        Document IDs (None for failed uploads) in the same order as files
+    """
+    # A file listed more than once (e.g. the same PDF under several hierarchies) is read once
+    paths = [f['path'] for f in files]
+    repeated = {path for path in paths if paths.count(path) > 1 and Path(path).exists()}
+    contents = {path: Path(path).read_bytes() for path in repeated}
+    
+    connector = aiohttp.TCPConnector(limit=16, keepalive_timeout=60)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        return await asyncio.gather(
+            *[
+                upload_with_hierarchy(session, f['path'], f['relative_path'], contents.get(f['path']))
+                for f in files
+            ]
+        )
+
 def demonstrate_hierarchy_scenarios():
     """
     Demonstrate different hierarchy scenarios
@@ -126,9 +158,9 @@ def demonstrate_hierarchy_scenarios():
                 print(f"📂 Output will be: output/{relative_path}/{Path(file_path).stem}/")
             else:
                 print(f"📂 Output will be: output/{Path(file_path).stem}/")
-            
-            # Uncomment the line below to actually upload (if files exist)
-            # upload_with_hierarchy(file_path, relative_path)
+    
+    # Uncomment the line below to actually upload every scenario's files at once (if files exist)
+    # asyncio.run(upload_batch([f for scenario in scenarios for f in scenario['files']]))
     
     print("\n💡 Usage Tips:")
     print("1. Use relative_input_path to preserve folder structure")
@@ -152,15 +184,16 @@ def show_api_usage_examples():
 import requests
 
 # Upload with hierarchy preservation
-files = {'file': open('samples/folder1/document.pdf', 'rb')}
 data = {
     'language': 'vie',
     'enable_handwriting_detection': False,
     'relative_input_path': 'folder1'  # NEW parameter
 }
 
-response = requests.post('http://localhost:8000/documents/transform', 
-                        files=files, data=data)
+with open('samples/folder1/document.pdf', 'rb') as f:  # Closed even if the request fails
+    files = {'file': ('document.pdf', f, 'application/pdf')}
+    response = requests.post('http://localhost:8000/documents/transform', 
+                            files=files, data=data)
 result = response.json()
 print(f"Document ID: {result['document_id']}")
 """)
@@ -208,22 +241,24 @@ def test_with_actual_files():
     print(f"\n🧪 Testing with {len(available_files)} sample files")
     print("=" * 50)
     
+    batch = []
     for i, file_path in enumerate(available_files):
         filename = Path(file_path).stem
         relative_path = f"test_batch_{i+1}"
+        batch.append({"path": file_path, "relative_path": relative_path})
         
         print(f"\n📄 Testing file: {file_path}")
         print(f"📁 Relative path: {relative_path}")
         print(f"📂 Expected output: output/{relative_path}/{filename}/")
-        
-        # Uncomment to actually test
-        # result = upload_with_hierarchy(file_path, relative_path)
-        # if result:
-        #     print(f"✅ Success: {result}")
-        # else:
-        #     print("❌ Failed")
-        
-        print("(Uncomment the upload lines in test_with_actual_files() to run actual tests)")
+    
+    # Uncomment to actually test - all files are uploaded concurrently
+    # for file_info, result in zip(batch, asyncio.run(upload_batch(batch))):
+    #     if result:
+    #         print(f"✅ Success: {file_info['path']} -> {result}")
+    #     else:
+    #         print(f"❌ Failed: {file_info['path']}")
+    
+    print("(Uncomment the upload lines in test_with_actual_files() to run actual tests)")
 
 if __name__ == "__main__":
     demonstrate_hierarchy_scenarios()
@@ -1,14 +1,22 @@
 import asyncio
 import concurrent.futures
+import hashlib
+import io
 import json
 import logging
+import multiprocessing
 import os
+import queue
+import random
+import re
+import shutil
+import tarfile
 import tempfile
 import threading
 import time
 import uuid
-from concurrent.futures import ThreadPoolExecutor
-from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager, nullcontext
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, Optional, Union
@@ -16,20 +24,43 @@ from typing import Any, Dict, Optional, Union
 import aiofiles
 import aiohttp
 import fitz  # PyMuPDF for PDF to image conversion
-import ocrmypdf
+import numpy as np
+import orjson
 import pytesseract
 import uvicorn
-from fastapi import BackgroundTasks, FastAPI, File, Form, HTTPException, UploadFile
+from cachetools import TTLCache
+from fastapi import (
+    BackgroundTasks,
+    FastAPI,
+    File,
+    Form,
+    HTTPException,
+    Request,
+    Response,
+    UploadFile,
+)
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from PIL import Image
 from pydantic import BaseModel, HttpUrl
-from PyPDF2 import PdfReader, PdfWriter
+from pypdf import PdfReader
 
 # Configure Tesseract data path
 TESSDATA_PREFIX = os.getenv("TESSDATA_PREFIX", "/usr/share/tesseract-ocr/4.00/tessdata")
 os.environ["TESSDATA_PREFIX"] = TESSDATA_PREFIX
 
+# Tesseract uses OpenMP and defaults to one thread per core. Pages are already OCR'd
+# in parallel, so multi-threaded Tesseract oversubscribes the CPU - keep it single-threaded
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+# tesserocr is optional - it keeps Tesseract loaded in-process instead of spawning a
+# process per page. Imported after OMP_THREAD_LIMIT is set so libtesseract picks it up
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
 # Configure logging with production optimization
 # Set to WARNING in production to reduce log noise, INFO for development
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
@@ -41,47 +72,166 @@ logger = logging.getLogger(__name__)
 
 # Configuration from environment variables
 MAX_WORKERS = int(os.getenv("MAX_WORKERS", "16"))
+# Worker processes for page processing; 0 keeps pages on per-document thread pools
+PROCESS_WORKERS = int(os.getenv("PROCESS_WORKERS", "0"))
 API_PORT = int(os.getenv("API_PORT", "8000"))
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",")
 CORS_CREDENTIALS = os.getenv("CORS_CREDENTIALS", "true").lower() == "true"
+# Explicit header list lets browsers cache preflight responses, unlike a "*" wildcard
+CORS_HEADERS = os.getenv(
+    "CORS_HEADERS", "Content-Type,Authorization,If-None-Match"
+).split(",")
+# Responses larger than this many bytes are gzip-compressed (per-page OCR text compresses well)
+GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", "1024"))
 
 # Output directory configuration
 OUTPUT_BASE_DIR = os.getenv("OUTPUT_BASE_DIR", "data/outputs")
 
+# Chunk size for streaming uploads/downloads to disk - larger chunks mean fewer thread hops
+FILE_CHUNK_SIZE = 64 * 1024
+# Uploads up to this size are processed straight from memory instead of a temp file
+STREAMING_THRESHOLD = int(os.getenv("STREAMING_THRESHOLD", str(256 * 1024 * 1024)))
+
+# Status streams are woken by task updates; after this many idle seconds they send a
+# keep-alive comment and recheck the task, so expired tasks still end the stream
+STATUS_EVENT_KEEPALIVE = 15
+# Longest a status request may long-poll with ?wait= for its task to change
+STATUS_WAIT_MAX = 120
+
+# Task status entries are dropped after this many seconds without an update, or once the
+# table is full (oldest first), so a long-running server does not accumulate them forever
+TASK_CACHE_SIZE = int(os.getenv("TASK_CACHE_SIZE", "10000"))
+TASK_TTL = int(os.getenv("TASK_TTL", "3600"))
+
+# OCR configuration - concurrency caps simultaneous Tesseract processes across all requests
+OCR_CONCURRENCY = int(os.getenv("OCR_CONCURRENCY", str(os.cpu_count() or 1)))
+OCR_RENDER_DPI = int(os.getenv("OCR_RENDER_DPI", "200"))
+# Minimum spacing between Tesseract starts in seconds (0 disables pacing)
+OCR_MIN_INTERVAL = float(os.getenv("OCR_MIN_INTERVAL", "0"))
+# Retries for timed-out or killed Tesseract runs before falling back to basic extraction
+OCR_MAX_ATTEMPTS = int(os.getenv("OCR_MAX_ATTEMPTS", "3"))
+OCR_RETRY_MAX_DELAY = float(os.getenv("OCR_RETRY_MAX_DELAY", "30"))
+# Languages whose tesserocr APIs are loaded at startup (and in each worker process)
+OCR_PRELOAD_LANGUAGES = [
+    lang for lang in os.getenv("OCR_PRELOAD_LANGUAGES", "vie").split(",") if lang
+]
+
+# Skew estimation searches +/-5 degrees in 0.1 degree steps over a bounded sample of ink pixels
+SKEW_ANGLES = np.linspace(-5.0, 5.0, 101)
+SKEW_SAMPLE_POINTS = 20000
+
+# Garbled-text patterns common in Vietnamese orientation issues, compiled once
+# at import; each pattern is counted separately, as the score thresholds expect
+GARBLED_TEXT_PATTERNS = [
+    re.compile(r"[\x00-\x1f\x7f-\x9f]{3,}"),  # Control characters
+    re.compile(
+        r'[^\w\s\u00C0-\u024F\u1E00-\u1EFF.,!?;:()\[\]{}"\'-/\\@#$%^&*+=<>|~`]{5,}'
+    ),  # Non-Vietnamese chars
+    re.compile(r"\?{3,}"),  # Multiple question marks (encoding issues)
+]
+# Whitespace stripped before measuring how much text a page has
+BLANK_CHARS_TABLE = str.maketrans("", "", " \n\t\r\x0b\x0c")
+
+# Per-page layout heuristics - wider pages suggest an A3 scan, smaller pages a low quality scan
+ASPECT_WIDE_THRESHOLD = 1.5
+SMALL_PAGE_BYTES = 50 * 1024
+SMALL_PAGE_MSG = "Small file size ({kb:.1f}KB) may indicate low quality scan"
+
+# Pages whose embedded text layer has enough mostly-alphabetic text skip OCR entirely
+USE_TEXT_LAYER = os.getenv("USE_TEXT_LAYER", "true").lower() == "true"
+TEXT_LAYER_MIN_CHARS = 200
+TEXT_LAYER_MIN_ALPHA_RATIO = 0.6
+# Images on text-layer pages covering at least this fraction of the page, with no embedded
+# text over them, are OCR'd on their own and merged into the page text
+TEXT_LAYER_IMAGE_MIN_AREA = 0.05
+
+# Preliminary limits - pages beyond them are flagged and skipped instead of OCR'd
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "0"))  # 0 means no page limit
+MAX_PAGE_BYTES = int(os.getenv("MAX_PAGE_BYTES", str(10 * 1024 * 1024)))
+MAX_PAGE_PIXELS = int(os.getenv("MAX_PAGE_PIXELS", "22400000"))  # At OCR_RENDER_DPI
+
 # Log startup configuration
-logger.info(f"OCR API starting with log level: {LOG_LEVEL}")
-logger.info(f"Configuration: {MAX_WORKERS} workers, listening on {API_HOST}:{API_PORT}")
+logger.info("OCR API starting with log level: %s", LOG_LEVEL)
+logger.info(
+    "Configuration: %d workers, listening on %s:%s", MAX_WORKERS, API_HOST, API_PORT
+)
 if LOG_LEVEL == "WARNING":
     logger.info("Production logging mode: Reduced verbosity for better performance")
 
 # Global variables
-processing_tasks: Dict[str, Dict[str, Any]] = {}
+processing_tasks: TTLCache = TTLCache(maxsize=TASK_CACHE_SIZE, ttl=TASK_TTL)
+# Guards processing_tasks - it is written from worker threads and read from the event loop
+processing_tasks_lock = threading.Lock()
+# (event loop, asyncio.Event) pairs per document, set by update_task to wake status streams
+status_listeners: Dict[str, set] = {}
 # Optimized for maximum parallel processing - configurable via environment
 thread_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+# Shared page-processing process pool, created at startup when PROCESS_WORKERS > 0
+process_pool: Optional[ProcessPoolExecutor] = None
+# Global OCR concurrency limit shared by every document being processed; replaced by a
+# cross-process semaphore when pages run in worker processes
+ocr_semaphore: Any = threading.BoundedSemaphore(OCR_CONCURRENCY)
+# Next time slot a Tesseract run may start at, shared by all workers for pacing
+ocr_rate_lock = threading.Lock()
+ocr_next_start = 0.0
+# Idle, initialized tesserocr APIs per language (loading traineddata is the expensive part)
+tesseract_api_pools: Dict[str, queue.SimpleQueue] = {}
+# Each worker thread keeps its last opened source document (PyMuPDF documents are not thread-safe)
+page_doc_cache = threading.local()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
+    global process_pool, ocr_semaphore
     logger.info("Starting PDF Processing API")
 
     # Create output directory
     output_dir = Path(OUTPUT_BASE_DIR)
     output_dir.mkdir(parents=True, exist_ok=True)
 
+    # Shared HTTP session so URL downloads reuse pooled connections (DNS, TLS)
+    app.state.http_session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=64, ttl_dns_cache=300)
+    )
+
+    if PROCESS_WORKERS > 0:
+        # spawn rather than fork - the server process already runs threads and an event loop
+        mp_context = multiprocessing.get_context("spawn")
+        # Spawned workers re-import this module, so hand them one shared semaphore;
+        # otherwise each would get its own and the cap would multiply by PROCESS_WORKERS
+        ocr_semaphore = mp_context.BoundedSemaphore(OCR_CONCURRENCY)
+        process_pool = ProcessPoolExecutor(
+            max_workers=PROCESS_WORKERS,
+            mp_context=mp_context,
+            initializer=init_process_worker,
+            initargs=(OCR_PRELOAD_LANGUAGES, ocr_semaphore),
+        )
+        logger.info("Processing pages in %d worker processes", PROCESS_WORKERS)
+    else:
+        preload_tesseract_apis(OCR_PRELOAD_LANGUAGES)
+
     yield
 
     # Cleanup
+    await app.state.http_session.close()
     thread_pool.shutdown(wait=True)
+    if process_pool is not None:
+        process_pool.shutdown(wait=True)
+    for pool in tesseract_api_pools.values():
+        while not pool.empty():
+            pool.get_nowait().End()
     logger.info("Shutting down PDF Processing API")
 
 
 app = FastAPI(
     title="PDF Processing API",
-    description="API for processing PDFs with deskewing using ocrmypdf",
+    description="API for processing PDFs with OCR and page quality analysis using Tesseract",
     version="1.0.0",
     lifespan=lifespan,
+    # orjson encodes large per-page results much faster than the stdlib json encoder
+    default_response_class=ORJSONResponse,
 )
 
 # Add CORS middleware - configurable for security
@@ -90,9 +240,14 @@ app.add_middleware(
     allow_origins=CORS_ORIGINS,
     allow_credentials=CORS_CREDENTIALS,
     allow_methods=["GET", "POST"],
-    allow_headers=["*"],
+    allow_headers=CORS_HEADERS,
+    # Status polling revalidates with If-None-Match, so clients must be able to read ETag
+    expose_headers=["ETag"],
 )
 
+# Compress large JSON results for clients that accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE)
+
 
 # Pydantic models
 class DocumentUploadURL(BaseModel):
@@ -150,101 +305,423 @@ class TaskStatus(BaseModel):
     updated_at: datetime
 
 
+def update_task(document_id: str, **fields: Any) -> None:
+    """Atomically update a processing task and bump its updated_at timestamp"""
+    with processing_tasks_lock:
+        task = processing_tasks.get(document_id)
+        if task is not None:
+            task.update(fields, updated_at=datetime.now())
+            # Re-insert so the TTL counts from the latest update, not task creation
+            processing_tasks[document_id] = task
+        listeners = list(status_listeners.get(document_id, ()))
+
+    # Updates come from worker threads, so hand the wake-up to each stream's own loop
+    for loop, event in listeners:
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            pass  # Loop already closed
+
+
+@contextmanager
+def status_listener(document_id: str):
+    """Register an asyncio.Event that update_task sets whenever the document's task changes"""
+    listener = (asyncio.get_running_loop(), asyncio.Event())
+    with processing_tasks_lock:
+        status_listeners.setdefault(document_id, set()).add(listener)
+    try:
+        yield listener[1]
+    finally:
+        with processing_tasks_lock:
+            listeners = status_listeners.get(document_id)
+            if listeners is not None:
+                listeners.discard(listener)
+                if not listeners:
+                    del status_listeners[document_id]
+
+
+def get_task_count() -> int:
+    """Return the number of tracked tasks, discarding expired ones first"""
+    with processing_tasks_lock:
+        processing_tasks.expire()
+        return len(processing_tasks)
+
+
+def get_task(document_id: str) -> Optional[Dict[str, Any]]:
+    """Return a consistent snapshot of a processing task, or None if unknown"""
+    with processing_tasks_lock:
+        task = processing_tasks.get(document_id)
+        return dict(task) if task is not None else None
+
+
 async def download_file(url: str, destination: str) -> bool:
     """Download file from URL to destination"""
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    async with aiofiles.open(destination, "wb") as f:
-                        async for chunk in response.content.iter_chunked(8192):
-                            await f.write(chunk)
-                    return True
-                else:
-                    logger.error(f"Failed to download file: HTTP {response.status}")
-                    return False
+        async with app.state.http_session.get(url) as response:
+            if response.status == 200:
+                async with aiofiles.open(destination, "wb") as f:
+                    async for chunk in response.content.iter_chunked(FILE_CHUNK_SIZE):
+                        await f.write(chunk)
+                return True
+            else:
+                logger.error("Failed to download file: HTTP %s", response.status)
+                return False
     except Exception as e:
-        logger.error(f"Error downloading file: {e}")
+        logger.error("Error downloading file: %s", e)
         return False
 
 
 async def save_upload_file(upload_file: UploadFile, destination: str) -> bool:
     """Save uploaded file to destination"""
     try:
-        async with aiofiles.open(destination, "wb") as f:
-            while chunk := await upload_file.read(8192):
-                await f.write(chunk)
+        # The upload is already spooled locally, so copy it in a single executor call
+        # rather than hopping to a worker thread for every read and write
+        def copy_to_destination():
+            upload_file.file.seek(0)
+            with open(destination, "wb") as f:
+                shutil.copyfileobj(upload_file.file, f, FILE_CHUNK_SIZE)
+
+        await asyncio.get_running_loop().run_in_executor(None, copy_to_destination)
         return True
     except Exception as e:
-        logger.error(f"Error saving upload file: {e}")
+        logger.error("Error saving upload file: %s", e)
         return False
 
 
+def open_pdf(pdf_source: Union[str, bytes]) -> fitz.Document:
+    """Open a PDF from a file path or from bytes already held in memory"""
+    if isinstance(pdf_source, bytes):
+        return fitz.open(stream=pdf_source, filetype="pdf")
+    return fitz.open(pdf_source)
+
+
+def get_cached_pdf(pdf_source: Union[str, bytes]) -> fitz.Document:
+    """Return this thread's open document for pdf_source, reopening only when the source changes"""
+    cached = getattr(page_doc_cache, "entry", None)
+    if cached is not None:
+        cached_source, doc = cached
+        if cached_source is pdf_source or (
+            isinstance(pdf_source, str) and cached_source == pdf_source
+        ):
+            return doc
+        doc.close()
+
+    doc = open_pdf(pdf_source)
+    page_doc_cache.entry = (pdf_source, doc)
+    return doc
+
+
+def close_cached_pdf() -> None:
+    """Close and forget this thread's cached document, if any"""
+    cached = getattr(page_doc_cache, "entry", None)
+    if cached is not None:
+        page_doc_cache.entry = None
+        cached[1].close()
+
+
+def pdf_source_size(pdf_source: Union[str, bytes]) -> int:
+    """Size in bytes of a PDF given as a file path or in-memory bytes"""
+    if isinstance(pdf_source, bytes):
+        return len(pdf_source)
+    return os.path.getsize(pdf_source)
+
+
+def read_page_metadata(pdf_source: Union[str, bytes]) -> list[Dict[str, Any]]:
+    """Read rotation, size and approximate byte size of every page in one pass"""
+    with open_pdf(pdf_source) as doc:
+        # Approximate each page's share of the file; replaced by real sizes when pages are exported
+        average_page_size = pdf_source_size(pdf_source) // max(doc.page_count, 1)
+        return [
+            {
+                "rotation": page.rotation,
+                "width": page.mediabox.width,
+                "height": page.mediabox.height,
+                "file_size": average_page_size,
+            }
+            for page in doc
+        ]
+
+
 def split_pdf_into_pages(
-    input_path: str, output_dir: str, filename_base: str
-) -> list[str]:
-    """Split PDF into individual page files using optimized I/O with in-memory processing"""
+    pdf_source: Union[str, bytes], output_dir: str, filename_base: str
+) -> list[tuple[str, str]]:
+    """Split PDF into individual page files, returning (absolute path, pdf/ relative path) pairs"""
     page_files = []
 
     try:
-        import io
-
         # Create pdf subdirectory if it doesn't exist
         pdf_dir = os.path.join(output_dir, "pdf")
         os.makedirs(pdf_dir, exist_ok=True)
 
-        # Read PDF into memory once for better performance
-        with open(input_path, "rb") as f:
-            pdf_data = f.read()
+        with open_pdf(pdf_source) as src:
+            for page_num in range(src.page_count):
+                page_filename = f"{filename_base}_page{page_num + 1}.pdf"
+                # Save PDF files in the pdf subdirectory
+                page_path = os.path.join(pdf_dir, page_filename)
 
-        reader = PdfReader(io.BytesIO(pdf_data))
-        total_pages = len(reader.pages)
+                # Copy the page objects as-is; skip garbage collection and recompression
+                with fitz.open() as dst:
+                    dst.insert_pdf(src, from_page=page_num, to_page=page_num)
+                    dst.save(page_path, garbage=0, deflate=False, clean=False)
 
-        for page_num in range(total_pages):
-            writer = PdfWriter()
-            writer.add_page(reader.pages[page_num])
+                page_files.append((page_path, f"pdf/{page_filename}"))
+                logger.info("Created page file: %s", page_path)
 
-            page_filename = f"{filename_base}_page{page_num + 1}.pdf"
-            # Save PDF files in the pdf subdirectory
-            page_path = os.path.join(pdf_dir, page_filename)
+        return page_files
 
-            # Use in-memory buffer for faster I/O
-            buffer = io.BytesIO()
-            writer.write(buffer)
-            buffer.seek(0)
+    except Exception as e:
+        logger.error("Error splitting PDF: %s", e)
+        return []
 
-            # Write to disk in single operation
-            with open(page_path, "wb") as output_file:
-                output_file.write(buffer.getvalue())
 
-            page_files.append(page_path)
-            logger.info(f"Created page file: {page_path}")
+def page_to_gray(
+    page: fitz.Page, dpi: int = OCR_RENDER_DPI, clip: Optional[fitz.Rect] = None
+) -> np.ndarray:
+    """Render an open PDF page (or a clip of it) to an 8-bit grayscale array in memory using PyMuPDF"""
+    zoom = dpi / 72
+    pix = page.get_pixmap(
+        matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False, clip=clip
+    )
+    # Wrap the raw samples directly instead of round-tripping through an image codec
+    samples = np.frombuffer(pix.samples, dtype=np.uint8)
+    return samples.reshape(pix.height, pix.stride)[:, : pix.width]
 
-        return page_files
 
-    except Exception as e:
-        logger.error(f"Error splitting PDF: {e}")
-        return []
+def render_page_gray(
+    pdf_source: Union[str, bytes], page_index: int = 0, dpi: int = OCR_RENDER_DPI
+) -> np.ndarray:
+    """Render a single PDF page to an 8-bit grayscale array in memory using PyMuPDF"""
+    return page_to_gray(get_cached_pdf(pdf_source)[page_index], dpi)
+
+
+def has_usable_text_layer(text: str) -> bool:
+    """Check whether a page's embedded text is substantial enough to skip OCR"""
+    meaningful_text = text.translate(BLANK_CHARS_TABLE)
+    if len(meaningful_text) <= TEXT_LAYER_MIN_CHARS:
+        return False
+    alpha_ratio = sum(1 for c in meaningful_text if c.isalpha()) / len(meaningful_text)
+    return alpha_ratio > TEXT_LAYER_MIN_ALPHA_RATIO
+
+
+def garbled_text_score(text: str) -> int:
+    """Count garbled-text matches in OCR output, summed over each garbled pattern"""
+    return sum(len(pattern.findall(text)) for pattern in GARBLED_TEXT_PATTERNS)
+
+
+def untexted_image_regions(page: fitz.Page) -> list[fitz.Rect]:
+    """Return sizeable image regions of a page that no embedded text block overlaps"""
+    min_area = abs(page.rect) * TEXT_LAYER_IMAGE_MIN_AREA
+    text_rects = [fitz.Rect(block[:4]) for block in page.get_text("blocks")]
+    regions = []
+    for info in page.get_image_info():
+        rect = fitz.Rect(info["bbox"]) & page.rect
+        if abs(rect) >= min_area and not any(rect.intersects(t) for t in text_rects):
+            regions.append(rect)
+    return regions
+
+
+def otsu_threshold(gray: np.ndarray) -> int:
+    """Compute the Otsu binarization threshold of a grayscale image"""
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    weight_bg = np.cumsum(hist)
+    weight_fg = weight_bg[-1] - weight_bg
+    cumulative_mean = np.cumsum(hist * np.arange(256))
+    mean_bg = cumulative_mean / np.maximum(weight_bg, 1)
+    mean_fg = (cumulative_mean[-1] - cumulative_mean) / np.maximum(weight_fg, 1)
+    # Between-class variance for every candidate threshold at once
+    between_variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return int(np.argmax(between_variance))
+
+
+def estimate_skew_angle(ink: np.ndarray) -> float:
+    """Estimate text skew in degrees from row projection profiles over candidate angles"""
+    # Downsample the ink mask and cap the number of sampled pixels to bound the cost
+    ys, xs = np.nonzero(ink[::2, ::2])
+    if len(ys) < 100:
+        return 0.0
+    step = max(1, len(ys) // SKEW_SAMPLE_POINTS)
+    ys, xs = ys[::step], xs[::step]
+
+    # Shear the sampled pixels for every angle at once; the angle that lines up
+    # the text rows gives the most sharply peaked row histogram
+    slopes = np.tan(np.radians(SKEW_ANGLES))[:, None]
+    rows = np.rint(ys[None, :] - xs[None, :] * slopes).astype(np.int64)
+    rows -= rows.min()
+    bins = int(rows.max()) + 1
+    offsets = np.arange(len(SKEW_ANGLES))[:, None] * bins
+    hist = np.bincount(
+        (rows + offsets).ravel(), minlength=len(SKEW_ANGLES) * bins
+    ).reshape(len(SKEW_ANGLES), bins)
+    scores = (hist.astype(np.float64) ** 2).sum(axis=1)
+
+    best = int(np.argmax(scores))
+    # Prefer no rotation unless another angle is strictly better
+    if scores[best] <= scores[len(SKEW_ANGLES) // 2]:
+        return 0.0
+    return float(SKEW_ANGLES[best])
+
+
+def preprocess_page_image(
+    gray: np.ndarray, deskew: bool = True
+) -> tuple[Image.Image, float]:
+    """Deskew and Otsu-binarize a grayscale page, returning a bilevel image and the skew angle"""
+    threshold = otsu_threshold(gray)
+    skew_angle = estimate_skew_angle(gray <= threshold) if deskew else 0.0
+
+    if skew_angle:
+        # Positive angles mean lines descend to the right; PIL rotates counter-clockwise
+        rotated = Image.fromarray(gray).rotate(
+            skew_angle, resample=Image.BILINEAR, expand=True, fillcolor=255
+        )
+        gray = np.asarray(rotated)
+
+    # Pack to a 1-bit image (1 = white) so Tesseract receives an already binarized page
+    height, width = gray.shape
+    packed = np.packbits(gray > threshold, axis=1)
+    return Image.frombytes("1", (width, height), packed.tobytes()), skew_angle
+
+
+def wait_for_ocr_slot() -> None:
+    """Block until the minimum interval since the previous Tesseract start has passed"""
+    global ocr_next_start
+    if OCR_MIN_INTERVAL <= 0:
+        return
+    with ocr_rate_lock:
+        now = time.monotonic()
+        start_at = max(now, ocr_next_start)
+        ocr_next_start = start_at + OCR_MIN_INTERVAL
+    if start_at > now:
+        time.sleep(start_at - now)
+
+
+def run_tesseract(func, *args, **kwargs):
+    """Run a pytesseract call under the global concurrency cap, pacing and retry policy"""
+    for attempt in range(1, OCR_MAX_ATTEMPTS + 1):
+        wait_for_ocr_slot()
+        try:
+            with ocr_semaphore:
+                return func(*args, **kwargs)
+        except RuntimeError as e:
+            # pytesseract raises a plain RuntimeError on timeout. A TesseractError is only
+            # transient if the process was killed by a signal (negative status, e.g. OOM)
+            retryable = not isinstance(e, pytesseract.TesseractError) or e.status < 0
+            if not retryable or attempt >= OCR_MAX_ATTEMPTS:
+                raise
+            # Exponential backoff with jitter so pages that failed together do not retry together
+            delay = min(OCR_RETRY_MAX_DELAY, 2 ** (attempt - 1) + random.random())
+            logger.warning(
+                "Tesseract attempt %d/%d failed (%s), retrying in %.1fs",
+                attempt,
+                OCR_MAX_ATTEMPTS,
+                e,
+                delay,
+            )
+            time.sleep(delay)
+
+
+def new_tesseract_api(language: str) -> "tesserocr.PyTessBaseAPI":
+    """Create a tesserocr API with the language data for language loaded"""
+    api = tesserocr.PyTessBaseAPI(
+        path=TESSDATA_PREFIX,
+        lang=language,
+        psm=tesserocr.PSM.AUTO_OSD,
+        oem=tesserocr.OEM.LSTM_ONLY,
+    )
+    api.SetVariable("user_defined_dpi", str(OCR_RENDER_DPI))
+    return api
+
+
+def preload_tesseract_apis(languages: list[str]) -> None:
+    """Load one pooled tesserocr API per language so the first pages skip traineddata loading"""
+    if tesserocr is None:
+        # pytesseract starts a fresh Tesseract process per call - nothing to keep loaded
+        return
+    for language in languages:
+        try:
+            api = new_tesseract_api(language)
+        except Exception as e:
+            # Missing language data must not break startup; pages fall back to lazy creation
+            logger.warning("Could not preload Tesseract language %s: %s", language, e)
+            continue
+        tesseract_api_pools.setdefault(language, queue.SimpleQueue()).put(api)
+
+
+def init_process_worker(languages: list[str], semaphore: Any) -> None:
+    """Process pool initializer: adopt the server's OCR semaphore and preload language data"""
+    global ocr_semaphore
+    ocr_semaphore = semaphore
+    # Each worker loads its language data once, before its first page
+    preload_tesseract_apis(languages)
+
+
+def ocr_image_with_api(image: Image.Image, language: str) -> tuple[str, list[float]]:
+    """OCR an image with a pooled tesserocr API, returning the text and per-word confidences"""
+    pool = tesseract_api_pools.setdefault(language, queue.SimpleQueue())
+    try:
+        api = pool.get_nowait()
+    except queue.Empty:
+        # At most OCR_CONCURRENCY APIs per language exist since callers hold ocr_semaphore
+        api = new_tesseract_api(language)
+
+    try:
+        api.SetImage(image)
+        text = api.GetUTF8Text()
+        word_confidences = [float(conf) for conf in api.AllWordConfidences()]
+    finally:
+        api.Clear()
+        pool.put(api)
+    return text, word_confidences
+
+
+def ocr_image(image: Image.Image, language: str) -> tuple[str, list[float]]:
+    """Run Tesseract once on an image, returning the text and per-word confidences"""
+    if tesserocr is not None:
+        # In-process OCR has no subprocess timeout to retry, only the concurrency cap
+        wait_for_ocr_slot()
+        with ocr_semaphore:
+            return ocr_image_with_api(image, language)
+
+    tsv = run_tesseract(
+        pytesseract.image_to_data,
+        image,
+        lang=language,
+        config=f"--oem 1 --psm 1 --dpi {OCR_RENDER_DPI}",  # LSTM engine, automatic segmentation
+        timeout=180,  # Generous timeout for complex pages
+    )
+
+    # TSV columns: level page block par line word left top width height conf text.
+    # Level 5 rows are words; regroup them into lines and paragraphs in reading order
+    paragraphs: Dict[tuple, Dict[str, list[str]]] = {}
+    word_confidences = []
+    for row in tsv.splitlines()[1:]:
+        columns = row.split("\t")
+        if len(columns) != 12 or columns[0] != "5" or not columns[11].strip():
+            continue
+        paragraph = paragraphs.setdefault(tuple(columns[1:4]), {})
+        paragraph.setdefault(columns[4], []).append(columns[11])
+        confidence = float(columns[10])
+        if confidence >= 0:
+            word_confidences.append(confidence)
+
+    text = "\n\n".join(
+        "\n".join(" ".join(words) for words in lines.values())
+        for lines in paragraphs.values()
+    )
+    return text, word_confidences
 
 
 def optimized_ocr_with_quality_analysis(
-    pdf_path: str,
+    pdf_source: Union[str, bytes],
     page_number: int,
-    output_text_path: str,
+    output_text_path: Optional[str],
     language: str = "vie",
     enable_handwriting_detection: bool = False,
 ) -> tuple[str, Dict[str, Any], list]:
-    """Optimized OCR that combines deskew, rotate, text extraction, and quality analysis in minimal calls"""
+    """Optimized OCR that renders the page in-process and runs Tesseract directly, combining text extraction and quality analysis"""
     try:
-        import re
-        import subprocess
-        import sys
-        import tempfile
-
         quality_issues = []
         analysis_data = {
             "page_number": page_number,
-            "file_size": os.path.getsize(pdf_path),
             "rotation": 0,
             "is_blank": False,
             "blank_confidence": 0.0,
@@ -258,334 +735,183 @@ def optimized_ocr_with_quality_analysis(
 
         start_time = time.time()
 
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Single optimized ocrmypdf call with combined operations
-            output_pdf = os.path.join(temp_dir, f"page_{page_number}_processed.pdf")
-            sidecar_text = os.path.join(temp_dir, f"page_{page_number}_text.txt")
-
-            # Optimized command with quality corrections and 16 workers
-            cmd = [
-                sys.executable,
-                "-m",
-                "ocrmypdf",
-                # "--deskew",  # Skip deskewing for speed
-                # "--rotate-pages",  # Skip rotation for speed
-                "--force-ocr",  # Ensure OCR runs
-                "--sidecar",
-                sidecar_text,  # Extract text to file
-                "--tesseract-oem",
-                "1",  # Use LSTM OCR engine for speed
-                "--tesseract-pagesegmode",
-                "1",  # Automatic page segmentation for speed
-                "--optimize",
-                "0",  # Skip optimization for speed
-                "--pdfa-image-compression",
-                "jpeg",  # Faster compression
-                "--image-dpi",
-                "75",  # Reduced DPI for faster processing
-                "--jpeg-quality",
-                "75",  # Good quality
-                "--skip-big",
-                "30",  # Skip large images
-                "--tesseract-timeout",
-                "180",  # Increased timeout for complex pages
-                "--fast-web-view",
-                "0",  # Disable web view optimization
-                pdf_path,
-                output_pdf,
-            ]
-
-            # Add language parameter
-            if language and language != "eng":
-                cmd.extend(["--language", language])
-
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=180,  # Increased timeout for complex pages
+        # Digital pages already carry a text layer - use it and skip rendering and OCR
+        # Pages of one document usually land on the same worker, so reuse its open document
+        page = get_cached_pdf(pdf_source)[page_number - 1]
+        embedded_text = page.get_text() if USE_TEXT_LAYER else ""
+        ocr_skipped = has_usable_text_layer(embedded_text)
+        gray = None if ocr_skipped else page_to_gray(page)
+        analysis_data["ocr_skipped"] = ocr_skipped
+
+        if ocr_skipped:
+            extracted_text, word_confidences = embedded_text, []
+            skew_angle = 0.0
+            # Mixed pages: OCR only the image regions the text layer does not cover
+            image_regions = untexted_image_regions(page)
+            for region in image_regions:
+                region_image, _ = preprocess_page_image(
+                    page_to_gray(page, clip=region), deskew=False
+                )
+                region_text, _ = ocr_image(region_image, language)
+                if region_text.strip():
+                    extracted_text += "\n\n" + region_text
+            analysis_data["ocr_regions"] = len(image_regions)
+        else:
+            # Render in-process and run a single OCR pass; every quality signal below
+            # is derived from this one pass instead of re-running OCR per check
+            image, skew_angle = preprocess_page_image(gray)
+            extracted_text, word_confidences = ocr_image(image, language)
+
+        # Skew was measured (and corrected) during preprocessing
+        skew_angle = abs(skew_angle)
+        analysis_data["skew_angle"] = skew_angle
+        if skew_angle > 1.0:
+            analysis_data["is_skewed"] = True
+            analysis_data["skew_confidence"] = min(0.9, skew_angle / 10.0)
+            severity = (
+                "high" if skew_angle > 5 else "medium" if skew_angle > 2 else "low"
+            )
+            quality_issues.append(
+                {
+                    "issue_type": "skew",
+                    "page_number": page_number,
+                    "severity": severity,
+                    "description": f"Page is skewed by {skew_angle:.1f} degrees",
+                    "confidence": analysis_data["skew_confidence"],
+                }
             )
 
-            # Parse OCR output for quality analysis
-            stderr_output = result.stderr.lower() if result.stderr else ""
-
-            # Detect skewness from output
-            skew_patterns = [
-                r"deskewing.*?([-+]?\d*\.?\d+).*?degrees?",
-                r"skew.*?([-+]?\d*\.?\d+).*?deg",
-                r"rotation.*?([-+]?\d*\.?\d+)",
-            ]
-
-            for pattern in skew_patterns:
-                match = re.search(pattern, stderr_output, re.IGNORECASE)
-                if match:
-                    skew_angle = abs(float(match.group(1)))
-                    analysis_data["skew_angle"] = skew_angle
-                    if skew_angle > 1.0:
-                        analysis_data["is_skewed"] = True
-                        analysis_data["skew_confidence"] = min(0.9, skew_angle / 10.0)
-                        severity = (
-                            "high"
-                            if skew_angle > 5
-                            else "medium" if skew_angle > 2 else "low"
-                        )
-                        quality_issues.append(
-                            {
-                                "issue_type": "skew",
-                                "page_number": page_number,
-                                "severity": severity,
-                                "description": f"Page is skewed by {skew_angle:.1f} degrees",
-                                "confidence": analysis_data["skew_confidence"],
-                            }
-                        )
-                    break
+        # Vietnamese text quality validation - fastest fix for orientation issues
+        if language == "vie" and extracted_text:
+            # Check for garbled text patterns common in Vietnamese orientation issues
+            garbled_score = garbled_text_score(extracted_text)
 
-            # Detect orientation issues
-            if "rotating" in stderr_output or "rotated" in stderr_output:
+            # If text appears garbled, mark as orientation issue
+            if garbled_score > 2 or (len(extracted_text) > 50 and garbled_score > 0):
                 analysis_data["orientation_issue"] = True
-                rotation_match = re.search(r"(90|180|270)", stderr_output)
-                if rotation_match:
-                    analysis_data["suggested_rotation"] = int(rotation_match.group(1))
+                analysis_data["suggested_rotation"] = (
+                    180  # Most common fix for Vietnamese docs
+                )
 
                 quality_issues.append(
                     {
                         "issue_type": "orientation",
                         "page_number": page_number,
                         "severity": "high",
-                        "description": f"Page orientation issue detected, suggested rotation: {analysis_data['suggested_rotation']} degrees",
-                        "confidence": 0.8,
+                        "description": f"Vietnamese text appears garbled, likely orientation issue (garbled score: {garbled_score})",
+                        "confidence": min(0.9, 0.5 + (garbled_score * 0.1)),
                     }
                 )
 
-            # Read extracted text
-            extracted_text = ""
-            if os.path.exists(sidecar_text):
-                with open(sidecar_text, "r", encoding="utf-8") as f:
-                    extracted_text = f.read().strip()
-
-                # Vietnamese text quality validation - fastest fix for orientation issues
-                if language == "vie" and extracted_text:
-                    # Check for garbled text patterns common in Vietnamese orientation issues
-                    garbled_patterns = [
-                        r"[\x00-\x1f\x7f-\x9f]{3,}",  # Control characters
-                        r'[^\w\s\u00C0-\u024F\u1E00-\u1EFF.,!?;:()\[\]{}"\'-/\\@#$%^&*+=<>|~`]{5,}',  # Non-Vietnamese chars
-                        r"\?{3,}",  # Multiple question marks (encoding issues)
-                    ]
+        # Save extracted text to final output location unless the caller bundles it
+        if output_text_path:
+            with open(output_text_path, "w", encoding="utf-8") as f:
+                f.write(extracted_text)
 
-                    garbled_score = 0
-                    for pattern in garbled_patterns:
-                        matches = re.findall(pattern, extracted_text)
-                        garbled_score += len(matches)
-
-                    # If text appears garbled, mark as orientation issue
-                    if garbled_score > 2 or (
-                        len(extracted_text) > 50 and garbled_score > 0
-                    ):
-                        analysis_data["orientation_issue"] = True
-                        analysis_data["suggested_rotation"] = (
-                            180  # Most common fix for Vietnamese docs
-                        )
+        # Analyze text for blank page detection
+        meaningful_text = extracted_text.translate(BLANK_CHARS_TABLE)
+        text_length = len(meaningful_text)
 
-                        quality_issues.append(
-                            {
-                                "issue_type": "orientation",
-                                "page_number": page_number,
-                                "severity": "high",
-                                "description": f"Vietnamese text appears garbled, likely orientation issue (garbled score: {garbled_score})",
-                                "confidence": min(0.9, 0.5 + (garbled_score * 0.1)),
-                            }
-                        )
+        if text_length < 5:
+            analysis_data["is_blank"] = True
+            if text_length == 0:
+                analysis_data["blank_confidence"] = 0.95
+            elif text_length < 3:
+                analysis_data["blank_confidence"] = 0.85
+            else:
+                analysis_data["blank_confidence"] = 0.70
 
-                # Copy to final output location
-                with open(output_text_path, "w", encoding="utf-8") as f:
-                    f.write(extracted_text)
+            quality_issues.append(
+                {
+                    "issue_type": "blank_page",
+                    "page_number": page_number,
+                    "severity": "medium",
+                    "description": "Page appears to be blank or contains minimal content",
+                    "confidence": analysis_data["blank_confidence"],
+                }
+            )
 
-            # Analyze text for blank page detection
-            meaningful_text = (
-                extracted_text.replace(" ", "").replace("\n", "").replace("\t", "")
+        elif enable_handwriting_detection and not ocr_skipped:
+            # Handwriting shows up as low word confidence and a low share of letters
+            handwriting_score = 0
+            mean_confidence = (
+                sum(word_confidences) / len(word_confidences) if word_confidences else 0.0
             )
-            text_length = len(meaningful_text)
+            low_confidence_ratio = (
+                sum(1 for conf in word_confidences if conf < 50) / len(word_confidences)
+                if word_confidences
+                else 1.0
+            )
+            alpha_ratio = sum(1 for c in meaningful_text if c.isalpha()) / text_length
+
+            if mean_confidence < 60:
+                handwriting_score += 40
+            if low_confidence_ratio > 0.4:
+                handwriting_score += 30
+            if alpha_ratio < 0.5:
+                handwriting_score += 30
 
-            if text_length < 5:
-                analysis_data["is_blank"] = True
-                if text_length == 0:
-                    analysis_data["blank_confidence"] = 0.95
-                elif text_length < 3:
-                    analysis_data["blank_confidence"] = 0.85
-                else:
-                    analysis_data["blank_confidence"] = 0.70
+            analysis_data["mean_word_confidence"] = mean_confidence
+            analysis_data["handwriting_score"] = handwriting_score
 
+            if handwriting_score >= 60:
                 quality_issues.append(
                     {
-                        "issue_type": "blank_page",
+                        "issue_type": "handwriting",
                         "page_number": page_number,
                         "severity": "medium",
-                        "description": "Page appears to be blank or contains minimal content",
-                        "confidence": analysis_data["blank_confidence"],
+                        "description": f"Page likely contains handwriting (mean word confidence {mean_confidence:.0f}%)",
+                        "confidence": min(0.9, handwriting_score / 100),
                     }
                 )
 
-            analysis_data["processing_time"] = time.time() - start_time
+        analysis_data["processing_time"] = time.time() - start_time
 
-            return extracted_text, analysis_data, quality_issues
+        return extracted_text, analysis_data, quality_issues
 
     except Exception as e:
-        logger.error(f"Optimized OCR failed for {pdf_path}: {e}")
+        logger.error("Optimized OCR failed for page %d: %s", page_number, e)
         # Fallback to basic text extraction
         return (
-            extract_text_fallback(pdf_path, output_text_path, language),
+            extract_text_fallback(
+                pdf_source, output_text_path, language, page_number - 1
+            ),
             {"page_number": page_number, "processing_error": str(e)},
             [],
         )
 
 
 def extract_text_fallback(
-    pdf_path: str, output_text_path: str, language: str = "vie"
+    pdf_source: Union[str, bytes],
+    output_text_path: Optional[str],
+    language: str = "vie",
+    page_index: int = 0,
 ) -> str:
     """Fallback text extraction using PyMuPDF + Tesseract (original method)"""
     try:
-        # Convert PDF page to image using PyMuPDF with reduced DPI for speed
-        doc = fitz.open(pdf_path)
-        page = doc[0]  # First (and only) page
-
-        # Render page as image with reduced zoom for faster processing
-        mat = fitz.Matrix(1.5, 1.5)  # Reduced from 2.0x to 1.5x for speed
-        pix = page.get_pixmap(matrix=mat)
-        img_data = pix.tobytes("ppm")
-
-        # Convert to PIL Image
-        from io import BytesIO
-
-        img = Image.open(BytesIO(img_data))
+        # Render grayscale and binarize in NumPy; skip deskewing to keep the fallback simple
+        img, _ = preprocess_page_image(
+            render_page_gray(pdf_source, page_index), deskew=False
+        )
 
         # Extract text using Tesseract with optimized config
-        custom_config = r"--oem 1 --psm 6 --dpi 150"  # Use LSTM engine, uniform text block, standard DPI
-        extracted_text = pytesseract.image_to_string(
-            img, lang=language, config=custom_config
+        custom_config = f"--oem 1 --psm 6 --dpi {OCR_RENDER_DPI}"  # Use LSTM engine, uniform text block
+        extracted_text = run_tesseract(
+            pytesseract.image_to_string, img, lang=language, config=custom_config
         )
 
-        # Save text to file
-        with open(output_text_path, "w", encoding="utf-8") as f:
-            f.write(extracted_text)
-
-        doc.close()
+        # Save text to file unless the caller bundles it
+        if output_text_path:
+            with open(output_text_path, "w", encoding="utf-8") as f:
+                f.write(extracted_text)
 
         return extracted_text.strip()
 
     except Exception as e:
-        logger.error(f"Fallback text extraction failed for {pdf_path}: {e}")
+        logger.error("Fallback text extraction failed for page %d: %s", page_index + 1, e)
         return ""
 
 
-def detect_skewness_with_ocrmypdf(
-    pdf_path: str, page_number: int, temp_dir: str
-) -> tuple[bool, float, float]:
-    """Detect page skewness using ocrmypdf analysis"""
-    try:
-        import re
-        import subprocess
-        import sys
-
-        # Run ocrmypdf with deskew to detect skew angle
-        output_path = os.path.join(temp_dir, f"page_{page_number}_deskew_test.pdf")
-        cmd = [
-            sys.executable,
-            "-m",
-            "ocrmypdf",
-            "--deskew",
-            "--force-ocr",
-            "--output-type",
-            "pdf",
-            pdf_path,
-            output_path,
-        ]
-
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-
-        # Parse output for skew information
-        skew_angle = 0.0
-        is_skewed = False
-        confidence = 0.0
-
-        # Look for skew information in stderr (ocrmypdf logs there)
-        if result.stderr:
-            # Search for deskew messages
-            skew_patterns = [
-                r"Deskewing.*?([-+]?\d*\.?\d+).*?degrees?",
-                r"skew.*?([-+]?\d*\.?\d+).*?deg",
-                r"rotation.*?([-+]?\d*\.?\d+)",
-            ]
-
-            for pattern in skew_patterns:
-                match = re.search(pattern, result.stderr, re.IGNORECASE)
-                if match:
-                    skew_angle = abs(float(match.group(1)))
-                    break
-
-        # Determine if significantly skewed (> 1 degree)
-        if skew_angle > 1.0:
-            is_skewed = True
-            confidence = min(0.9, skew_angle / 10.0)  # Higher angle = higher confidence
-        elif skew_angle > 0.5:
-            is_skewed = True
-            confidence = 0.6
-
-        return is_skewed, skew_angle, confidence
-
-    except Exception as e:
-        logger.warning(f"Skewness detection failed for page {page_number}: {e}")
-        return False, 0.0, 0.0
-
-
-def detect_orientation_with_ocrmypdf(
-    pdf_path: str, page_number: int, temp_dir: str
-) -> tuple[bool, int, float]:
-    """Detect page orientation issues using ocrmypdf"""
-    try:
-        import subprocess
-        import sys
-
-        # Run ocrmypdf with auto-rotate to detect orientation
-        output_path = os.path.join(temp_dir, f"page_{page_number}_orient_test.pdf")
-        cmd = [
-            sys.executable,
-            "-m",
-            "ocrmypdf",
-            "--rotate-pages",
-            "--force-ocr",
-            "--output-type",
-            "pdf",
-            pdf_path,
-            output_path,
-        ]
-
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-
-        # Check if rotation was applied
-        rotation_applied = 0
-        has_orientation_issue = False
-        confidence = 0.0
-
-        if result.stderr:
-            # Look for rotation messages
-            if "Rotating" in result.stderr or "rotated" in result.stderr:
-                has_orientation_issue = True
-                confidence = 0.8
-
-                # Try to extract rotation angle
-                import re
-
-                rotation_match = re.search(r"(90|180|270)", result.stderr)
-                if rotation_match:
-                    rotation_applied = int(rotation_match.group(1))
-
-        return has_orientation_issue, rotation_applied, confidence
-
-    except Exception as e:
-        logger.warning(f"Orientation detection failed for page {page_number}: {e}")
-        return False, 0, 0.0
-
-
 # Legacy function - now replaced by optimized_ocr_with_quality_analysis
 # Keeping for backward compatibility if needed
 def analyze_single_page_quality_legacy(
@@ -615,7 +941,7 @@ def analyze_single_page_quality_legacy(
 
     try:
         # Basic PDF analysis only
-        reader = PdfReader(pdf_path)
+        reader = PdfReader(pdf_path, strict=False)
         page = reader.pages[0]
 
         rotation = page.rotation if hasattr(page, "rotation") else 0
@@ -640,222 +966,11 @@ def analyze_single_page_quality_legacy(
             )
 
     except Exception as e:
-        logger.error(f"Error in legacy quality analysis for {pdf_path}: {e}")
+        logger.error("Error in legacy quality analysis for %s: %s", pdf_path, e)
 
     return quality_issues, analysis_data
 
 
-def detect_handwriting_with_ocrmypdf(
-    input_path: str, page_num: int, temp_dir: str
-) -> tuple[bool, float, dict]:
-    """Detect handwriting using ocrmypdf analysis"""
-    try:
-        # Extract single page for analysis
-        with open(input_path, "rb") as file:
-            pdf_reader = PdfReader(file)
-            pdf_writer = PdfWriter()
-            pdf_writer.add_page(pdf_reader.pages[page_num - 1])
-
-            page_path = os.path.join(temp_dir, f"page_{page_num}_handwriting.pdf")
-            with open(page_path, "wb") as page_file:
-                pdf_writer.write(page_file)
-
-        # Run OCR with different settings to detect handwriting patterns
-        import subprocess
-        import sys
-
-        # First: Try standard OCR
-        standard_ocr_path = os.path.join(temp_dir, f"page_{page_num}_standard.pdf")
-        cmd_standard = [
-            sys.executable,
-            "-m",
-            "ocrmypdf",
-            "--force-ocr",
-            "--optimize",
-            "0",
-            page_path,
-            standard_ocr_path,
-        ]
-
-        result_standard = subprocess.run(
-            cmd_standard, capture_output=True, text=True, timeout=60
-        )
-
-        # Second: Try with handwriting-optimized settings
-        handwriting_ocr_path = os.path.join(
-            temp_dir, f"page_{page_num}_handwriting.pdf"
-        )
-        cmd_handwriting = [
-            sys.executable,
-            "-m",
-            "ocrmypdf",
-            "--force-ocr",
-            "--tesseract-config",
-            "tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789 ",
-            "--optimize",
-            "0",
-            page_path,
-            handwriting_ocr_path,
-        ]
-
-        result_handwriting = subprocess.run(
-            cmd_handwriting, capture_output=True, text=True, timeout=60
-        )
-
-        # Analyze OCR results for handwriting indicators
-        indicators = {
-            "ocr_processing_difficulty": False,
-            "low_text_extraction": False,
-            "character_recognition_issues": False,
-        }
-
-        score = 0
-
-        # Check for OCR processing issues (common with handwriting)
-        if result_standard.stderr:
-            stderr_text = result_standard.stderr.lower()
-            if any(
-                phrase in stderr_text
-                for phrase in ["poor", "low quality", "difficult", "unclear"]
-            ):
-                indicators["ocr_processing_difficulty"] = True
-                score += 25
-
-        # Compare file sizes - handwriting often results in poor OCR extraction
-        original_size = os.path.getsize(page_path)
-        if os.path.exists(standard_ocr_path):
-            ocr_size = os.path.getsize(standard_ocr_path)
-            size_change = abs(ocr_size - original_size) / original_size
-
-            # Very small size change suggests poor text extraction (handwriting indicator)
-            if size_change < 0.02:
-                indicators["low_text_extraction"] = True
-                score += 30
-
-        # Check for character recognition issues by comparing different OCR approaches
-        if os.path.exists(handwriting_ocr_path) and os.path.exists(standard_ocr_path):
-            standard_size = os.path.getsize(standard_ocr_path)
-            handwriting_size = os.path.getsize(handwriting_ocr_path)
-
-            # Significant difference suggests character recognition challenges
-            if (
-                abs(standard_size - handwriting_size)
-                / max(standard_size, handwriting_size)
-                > 0.1
-            ):
-                indicators["character_recognition_issues"] = True
-                score += 20
-
-        # Additional check: Run OCR with very permissive settings
-        try:
-            permissive_ocr_path = os.path.join(
-                temp_dir, f"page_{page_num}_permissive.pdf"
-            )
-            cmd_permissive = [
-                sys.executable,
-                "-m",
-                "ocrmypdf",
-                "--force-ocr",
-                "--tesseract-config",
-                "tessedit_char_blacklist= ",
-                "--optimize",
-                "0",
-                page_path,
-                permissive_ocr_path,
-            ]
-
-            result_permissive = subprocess.run(
-                cmd_permissive, capture_output=True, text=True, timeout=60
-            )
-
-            # If permissive settings still struggle, likely handwriting
-            if (
-                result_permissive.returncode != 0
-                or "error" in result_permissive.stderr.lower()
-            ):
-                score += 25
-
-        except Exception:
-            # If permissive OCR fails completely, strong handwriting indicator
-            score += 35
-
-        handwriting_detected = score >= 60
-
-        return handwriting_detected, score, indicators
-
-    except Exception as e:
-        logger.warning(f"Handwriting detection failed for page {page_num}: {e}")
-        return False, 0, {}
-
-
-def detect_blank_page_with_ocrmypdf(
-    input_path: str, page_num: int, temp_dir: str
-) -> tuple[bool, float]:
-    """Detect blank pages using ocrmypdf analysis"""
-    try:
-        # input_path is already a single-page PDF file
-        page_path = input_path
-
-        # Run OCR to extract text
-        import subprocess
-        import sys
-
-        ocr_output_path = os.path.join(temp_dir, f"page_{page_num}_text_extract.pdf")
-        cmd = [
-            sys.executable,
-            "-m",
-            "ocrmypdf",
-            "--force-ocr",
-            "--sidecar",
-            os.path.join(temp_dir, f"page_{page_num}_text.txt"),
-            page_path,
-            ocr_output_path,
-        ]
-
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-
-        # Check extracted text content
-        text_file = os.path.join(temp_dir, f"page_{page_num}_text.txt")
-        text_content = ""
-        if os.path.exists(text_file):
-            with open(text_file, "r", encoding="utf-8") as f:
-                text_content = f.read().strip()
-
-        # Calculate text density
-        meaningful_text = (
-            text_content.replace(" ", "").replace("\n", "").replace("\t", "")
-        )
-        text_length = len(meaningful_text)
-
-        # Also check file size indicators
-        original_size = os.path.getsize(page_path)
-        if os.path.exists(ocr_output_path):
-            ocr_size = os.path.getsize(ocr_output_path)
-            size_ratio = ocr_size / original_size if original_size > 0 else 1
-        else:
-            size_ratio = 1
-
-        # Determine if page is blank
-        # Very little text (< 5 characters) and minimal size change suggests blank page
-        is_blank = text_length < 5 and size_ratio < 1.05
-
-        # Calculate confidence based on text length and processing results
-        if text_length == 0:
-            confidence = 0.95
-        elif text_length < 3:
-            confidence = 0.85
-        elif text_length < 10:
-            confidence = 0.70
-        else:
-            confidence = 0.0
-
-        return is_blank, confidence
-
-    except Exception as e:
-        logger.warning(f"Blank page detection failed for page {page_num}: {e}")
-        return False, 0.0
-
-
 def sanitize_relative_path(relative_path: str) -> str:
     """Sanitize relative path to prevent directory traversal attacks
 
@@ -891,130 +1006,48 @@ def sanitize_relative_path(relative_path: str) -> str:
     return sanitized.lstrip("/")
 
 
-def analyze_pdf_quality(input_path: str) -> tuple[list[QualityIssue], int]:
-    """Fast PDF quality analysis using PyPDF2 and basic file checks"""
-    quality_issues = []
-    total_pages = 0
-
-    # Get basic PDF info using PyPDF2 (already imported)
-    try:
-        with open(input_path, "rb") as file:
-            pdf_reader = PdfReader(file)
-            total_pages = len(pdf_reader.pages)
-
-            logger.info(f"Analyzing {total_pages} pages for quality issues")
-
-            # Basic page analysis using PyPDF2
-            for page_num, page in enumerate(pdf_reader.pages, 1):
-                # Check for rotation/orientation issues
-                rotation = page.rotation
-                if rotation == 180:
-                    quality_issues.append(
-                        QualityIssue(
-                            issue_type="orientation",
-                            page_number=page_num,
-                            severity="high",
-                            description=f"Page {page_num} is upside down (180° rotation detected in PDF metadata)",
-                            confidence=0.95,
-                        )
-                    )
-                elif rotation != 0:
-                    quality_issues.append(
-                        QualityIssue(
-                            issue_type="orientation",
-                            page_number=page_num,
-                            severity="medium",
-                            description=f"Page {page_num} rotated {rotation}° (detected in PDF metadata), may need correction",
-                            confidence=0.9,
-                        )
-                    )
-
-                # Check for blank space issues using mediabox
-                mediabox = page.mediabox
-                width = float(mediabox.width)
-                height = float(mediabox.height)
-                aspect_ratio = width / height if height > 0 else 1
-
-                # Detect A3 scanned A4 documents by aspect ratio
-                if aspect_ratio > 1.8:  # Excessive horizontal space
-                    quality_issues.append(
-                        QualityIssue(
-                            issue_type="blank_space",
-                            page_number=page_num,
-                            severity="high",
-                            description=f"Page {page_num} has excessive horizontal blank space (aspect ratio {aspect_ratio:.2f}), likely A4 document scanned on A3 setting",
-                            confidence=0.85,
-                        )
-                    )
-                elif aspect_ratio < 0.6:  # Excessive vertical space
-                    quality_issues.append(
-                        QualityIssue(
-                            issue_type="blank_space",
-                            page_number=page_num,
-                            severity="high",
-                            description=f"Page {page_num} has excessive vertical blank space (aspect ratio {aspect_ratio:.2f}), likely A4 document scanned on A3 setting",
-                            confidence=0.85,
-                        )
-                    )
-
-            # Quick file size analysis for quality estimation
-            file_size = os.path.getsize(input_path)
-            size_per_page = file_size / total_pages if total_pages > 0 else 0
-
-            # Very small files per page might indicate low quality scans
-            if size_per_page < 50000:  # Less than 50KB per page
-                quality_issues.append(
-                    QualityIssue(
-                        issue_type="low_quality",
-                        page_number=0,
-                        severity="medium",
-                        description=f"Small file size ({size_per_page/1024:.1f}KB per page) may indicate low quality scan",
-                        confidence=0.7,
-                    )
-                )
-
-            logger.info(
-                f"Quality analysis completed: {len(quality_issues)} issues found"
-            )
-
-    except Exception as e:
-        logger.warning(f"PDF quality analysis failed: {e}")
-        quality_issues.append(
-            QualityIssue(
-                issue_type="low_quality",
-                page_number=0,
-                severity="high",
-                description=f"Could not analyze PDF quality: {str(e)}",
-                confidence=0.8,
-            )
-        )
-
-    return quality_issues, total_pages
+# Removed analyze_pages_individually function - replaced with optimized sample-based analysis
 
 
-# Removed analyze_pages_individually function - replaced with optimized sample-based analysis
+def write_text_archive(
+    archive_path: str, filename_base: str, page_texts: Dict[int, str]
+) -> None:
+    """Write every page's text into one uncompressed tar, keeping the text/ file layout"""
+    with tarfile.open(archive_path, "w") as tar:
+        for page_number in sorted(page_texts):
+            data = page_texts[page_number].encode("utf-8")
+            info = tarfile.TarInfo(f"text/{filename_base}_page{page_number}.txt")
+            info.size = len(data)
+            info.mtime = int(time.time())
+            tar.addfile(info, io.BytesIO(data))
 
 
 def process_single_page(
-    page_file: str,
+    pdf_source: Union[str, bytes],
     page_number: int,
+    page_meta: Dict[str, Any],
     output_dir: str,
     filename_base: str,
     language: str,
     enable_handwriting_detection: bool = False,
-) -> tuple[PageResult, list[QualityIssue]]:
+    pdf_file: str = "",
+    bundle_text: bool = False,
+) -> tuple[PageResult, list[QualityIssue], Optional[str]]:
     """Process a single page using optimized OCR with combined quality analysis and text extraction"""
+    # Exported page PDFs are output only - OCR always renders from the source document
     try:
         # Use optimized OCR function that combines all operations
-        text_filename = f"{filename_base}_page{page_number}.txt"
-        # Save text files in the text subdirectory
-        text_dir = os.path.join(output_dir, "text")
-        os.makedirs(text_dir, exist_ok=True)
-        text_path = os.path.join(text_dir, text_filename)
+        text_file = f"text/{filename_base}_page{page_number}.txt"
+        if not bundle_text:
+            # Save text files in the text subdirectory (created once by the caller)
+            text_path = os.path.join(output_dir, text_file)
+        else:
+            # Full text is returned and written to a single archive by the caller
+            text_path = None
 
         extracted_text, analysis_data, quality_issues_raw = (
             optimized_ocr_with_quality_analysis(
-                page_file,
+                pdf_source,
                 page_number,
                 text_path,
                 language,
@@ -1022,90 +1055,76 @@ def process_single_page(
             )
         )
 
-        # Convert raw quality issues to QualityIssue objects
-        page_issues = []
-        for issue in quality_issues_raw:
+        # Convert raw quality issues to QualityIssue objects. The values are produced
+        # here rather than by clients, so skip per-field validation with model_construct
+        page_issues = [
+            QualityIssue.model_construct(**issue) for issue in quality_issues_raw
+        ]
+
+        # Add basic quality checks from the page metadata read up front
+        rotation = page_meta["rotation"]
+        width = page_meta["width"]
+        height = page_meta["height"]
+        analysis_data["file_size"] = page_meta["file_size"]
+
+        # Check for rotation in PDF metadata
+        if rotation != 0:
             page_issues.append(
-                QualityIssue(
-                    issue_type=issue["issue_type"],
-                    page_number=issue["page_number"],
-                    severity=issue["severity"],
-                    description=issue["description"],
-                    confidence=issue["confidence"],
+                QualityIssue.model_construct(
+                    issue_type="orientation",
+                    page_number=page_number,
+                    severity="medium",
+                    description=f"PDF metadata shows {rotation} degree rotation",
+                    confidence=0.9,
                 )
             )
 
-        # Add basic quality checks from PDF metadata
-        try:
-            reader = PdfReader(page_file)
-            page = reader.pages[0]
-
-            # Check for rotation in PDF metadata
-            rotation = page.rotation if hasattr(page, "rotation") else 0
-            if rotation != 0:
-                page_issues.append(
-                    QualityIssue(
-                        issue_type="orientation",
-                        page_number=page_number,
-                        severity="medium",
-                        description=f"PDF metadata shows {rotation} degree rotation",
-                        confidence=0.9,
-                    )
-                )
+        # Check page dimensions for aspect ratio issues
+        aspect_ratio = width / height if height > 0 else 0
 
-            # Check page dimensions for aspect ratio issues
-            mediabox = page.mediabox
-            width = float(mediabox.width)
-            height = float(mediabox.height)
-            aspect_ratio = width / height if height > 0 else 0
-
-            analysis_data["width"] = width
-            analysis_data["height"] = height
-            analysis_data["aspect_ratio"] = aspect_ratio
-            analysis_data["rotation"] = rotation
-
-            # Check for blank space (A3 scanned as A4)
-            if aspect_ratio > 1.5:  # Wider than normal
-                page_issues.append(
-                    QualityIssue(
-                        issue_type="blank_space",
-                        page_number=page_number,
-                        severity="medium",
-                        description="Possible A3 document scanned as A4 (excess blank space)",
-                        confidence=0.7,
-                    )
-                )
+        analysis_data["width"] = width
+        analysis_data["height"] = height
+        analysis_data["aspect_ratio"] = aspect_ratio
+        analysis_data["rotation"] = rotation
 
-            # Check file size for quality issues
-            size_per_page_kb = analysis_data["file_size"] / 1024
-            if size_per_page_kb < 50:  # Very small file size
-                page_issues.append(
-                    QualityIssue(
-                        issue_type="low_quality",
-                        page_number=page_number,
-                        severity="medium",
-                        description=f"Small file size ({size_per_page_kb:.1f}KB) may indicate low quality scan",
-                        confidence=0.6,
-                    )
+        # Check for blank space (A3 scanned as A4)
+        if aspect_ratio > ASPECT_WIDE_THRESHOLD:  # Wider than normal
+            page_issues.append(
+                QualityIssue.model_construct(
+                    issue_type="blank_space",
+                    page_number=page_number,
+                    severity="medium",
+                    description="Possible A3 document scanned as A4 (excess blank space)",
+                    confidence=0.7,
                 )
+            )
 
-        except Exception as metadata_error:
-            # Only log metadata errors in debug mode to reduce noise
-            if logger.isEnabledFor(logging.DEBUG):
-                logger.warning(
-                    f"Could not read PDF metadata for page {page_number}: {metadata_error}"
+        # Check file size for quality issues; the message is only formatted when it fires
+        if analysis_data["file_size"] < SMALL_PAGE_BYTES:  # Very small file size
+            page_issues.append(
+                QualityIssue.model_construct(
+                    issue_type="low_quality",
+                    page_number=page_number,
+                    severity="medium",
+                    description=SMALL_PAGE_MSG.format(
+                        kb=analysis_data["file_size"] / 1024
+                    ),
+                    confidence=0.6,
                 )
+            )
+
+        # Measure the text once; the count is reported and reused for the preview and logging
+        char_count = len(extracted_text)
+        analysis_data["char_count"] = char_count
 
         # Create page result with subdirectory paths
         page_result = PageResult(
             page_number=page_number,
-            pdf_file=f"pdf/{os.path.basename(page_file)}",
-            text_file=f"text/{os.path.basename(text_path)}",
+            pdf_file=pdf_file,
+            text_file=text_file,
             quality_analysis=analysis_data,
             extracted_text=(
-                extracted_text[:500] + "..."
-                if len(extracted_text) > 500
-                else extracted_text
+                extracted_text[:500] + "..." if char_count > 500 else extracted_text
             ),  # Truncate for response
             issues=page_issues,
         )
@@ -1113,162 +1132,318 @@ def process_single_page(
         # Optimized logging for production - only log pages with issues or every 10th page
         if len(page_issues) > 0 or page_number % 10 == 0:
             logger.info(
-                f"Page {page_number}: {len(page_issues)} issues, {len(extracted_text)} chars, {analysis_data.get('processing_time', 0):.2f}s"
+                "Page %d: %d issues, %d chars, %.2fs",
+                page_number,
+                len(page_issues),
+                char_count,
+                analysis_data.get("processing_time", 0),
             )
 
-        return page_result, page_issues
+        return page_result, page_issues, extracted_text if bundle_text else None
 
     except Exception as e:
-        logger.error(f"Error processing page {page_number}: {e}")
-        # Return error page result
-        error_issue = QualityIssue(
-            issue_type="low_quality",
-            page_number=page_number,
-            severity="high",
-            description=f"Page processing failed: {str(e)}",
-            confidence=0.9,
-        )
+        logger.error("Error processing page %d: %s", page_number, e)
+        return failed_page_result(page_number, pdf_file, str(e))
+
+
+def failed_page_result(
+    page_number: int, pdf_file: str, error: str
+) -> tuple[PageResult, list[QualityIssue], Optional[str]]:
+    """Build the result reported for a page whose processing failed"""
+    error_issue = QualityIssue(
+        issue_type="low_quality",
+        page_number=page_number,
+        severity="high",
+        description=f"Page processing failed: {error}",
+        confidence=0.9,
+    )
+
+    error_page_result = PageResult(
+        page_number=page_number,
+        pdf_file=pdf_file,
+        text_file="",
+        quality_analysis={"page_number": page_number, "processing_error": error},
+        extracted_text="",
+        issues=[error_issue],
+    )
+
+    return error_page_result, [error_issue], None
+
+
+def oversized_page_reason(page_number: int, page_meta: Dict[str, Any]) -> Optional[str]:
+    """Return why a page exceeds the preliminary size limits, or None if it is within them"""
+    if MAX_PDF_PAGES and page_number > MAX_PDF_PAGES:
+        return f"document exceeds {MAX_PDF_PAGES} pages"
+    if page_meta["file_size"] > MAX_PAGE_BYTES:
+        return f"page is {page_meta['file_size'] / (1024 * 1024):.1f}MB"
+    zoom = OCR_RENDER_DPI / 72
+    pixels = page_meta["width"] * zoom * page_meta["height"] * zoom
+    if pixels > MAX_PAGE_PIXELS:
+        return f"page renders to {pixels / 1e6:.1f} megapixels"
+    return None
+
+
+def skipped_page_result(
+    page_number: int, pdf_file: str, reason: str
+) -> tuple[PageResult, list[QualityIssue]]:
+    """Build the result reported for a page skipped by the preliminary size limits"""
+    skip_issue = QualityIssue(
+        issue_type="low_quality",
+        page_number=page_number,
+        severity="high",
+        description=f"Oversized page skipped: {reason}",
+        confidence=0.9,
+    )
+
+    skipped_result = PageResult(
+        page_number=page_number,
+        pdf_file=pdf_file,
+        text_file="",
+        quality_analysis={"page_number": page_number, "skipped": reason},
+        extracted_text="",
+        issues=[skip_issue],
+    )
+
+    return skipped_result, [skip_issue]
+
+
+def process_page_batch(
+    pdf_source: Union[str, bytes],
+    pages: list[tuple[int, Dict[str, Any], str]],
+    output_dir: str,
+    filename_base: str,
+    language: str,
+    enable_handwriting_detection: bool = False,
+    bundle_text: bool = False,
+) -> list[tuple[PageResult, list[QualityIssue], Optional[str]]]:
+    """Process several (page_number, page_meta, pdf_file) pages in one executor task"""
+    try:
+        return [
+            process_single_page(
+                pdf_source,
+                page_number,
+                page_meta,
+                output_dir,
+                filename_base,
+                language,
+                enable_handwriting_detection,
+                pdf_file,
+                bundle_text,
+            )
+            for page_number, page_meta, pdf_file in pages
+        ]
+    finally:
+        # Pool workers outlive the job - don't hold its document (possibly a spill
+        # file about to be deleted) open until the worker's next document arrives
+        if multiprocessing.parent_process() is not None:
+            close_cached_pdf()
 
-        error_page_result = PageResult(
-            page_number=page_number,
-            pdf_file=f"pdf/{os.path.basename(page_file)}",
-            text_file="",
-            quality_analysis={"page_number": page_number, "processing_error": str(e)},
-            extracted_text="",
-            issues=[error_issue],
-        )
 
-        return error_page_result, [error_issue]
+def write_analysis_json(
+    json_output_path: str, summary: Dict[str, Any], lists: Dict[str, list[BaseModel]]
+) -> None:
+    """Write the analysis JSON one model at a time instead of building a full dict copy.
+
+    Only the serialized copy is avoided - the models themselves stay in memory for the
+    ProcessingResponse. summary must be non-empty, as the lists are spliced in after it.
+    """
+    with open(json_output_path, "wb") as f:
+        # Reopen the indented summary object ("...\n}") to append the model lists
+        f.write(orjson.dumps(summary, option=orjson.OPT_INDENT_2)[:-2])
+        for key, models in lists.items():
+            f.write(f',\n  "{key}": ['.encode())
+            for i, model in enumerate(models):
+                f.write(b"\n    " if i == 0 else b",\n    ")
+                item = orjson.dumps(model.model_dump(), option=orjson.OPT_INDENT_2)
+                f.write(item.replace(b"\n", b"\n    "))
+            f.write(b"\n  ]" if models else b"]")
+        f.write(b"\n}\n")
 
 
 def process_pdf_with_per_page_analysis(
     document_id: str,
-    input_path: str,
+    pdf_source: Union[str, bytes],
     output_dir: str,
     filename_base: str,
     language: str = "vie",
     enable_handwriting_detection: bool = False,
+    export_page_pdfs: bool = True,
+    bundle_text_files: bool = False,
 ) -> ProcessingResponse:
-    """Process PDF by splitting into individual pages with parallel quality analysis and text extraction"""
+    """Process PDF pages in parallel with quality analysis and text extraction, optionally exporting per-page PDFs"""
     start_time = time.time()
+    spill_path = None
 
     try:
         # Update task status
-        processing_tasks[document_id]["status"] = "processing"
-        processing_tasks[document_id]["progress"] = 0.1
-        processing_tasks[document_id]["updated_at"] = datetime.now()
+        update_task(document_id, status="processing", progress=0.1)
 
         logger.info(
-            f"Starting per-page PDF analysis and processing for document {document_id}"
+            "Starting per-page PDF analysis and processing for document %s", document_id
         )
 
-        # Step 1: Split PDF into individual pages
-        processing_tasks[document_id]["progress"] = 0.2
-        logger.info(f"Splitting PDF into individual pages for document {document_id}")
-        page_files = split_pdf_into_pages(input_path, output_dir, filename_base)
+        # Step 1: Read page metadata once for all page tasks, then split if requested
+        update_task(document_id, progress=0.2)
+        page_meta_list = read_page_metadata(pdf_source)
+        if not page_meta_list:
+            raise Exception("PDF contains no pages")
+
+        if export_page_pdfs:
+            logger.info(
+                "Splitting PDF into individual pages for document %s", document_id
+            )
+            page_files = split_pdf_into_pages(pdf_source, output_dir, filename_base)
+
+            if not page_files:
+                raise Exception("Failed to split PDF into pages")
+
+            logger.info("Split PDF into %d pages", len(page_files))
+            for page_meta, (page_path, _) in zip(page_meta_list, page_files):
+                page_meta["file_size"] = os.path.getsize(page_path)
+            # Relative pdf/ paths are computed once here and reused by every page task
+            pdf_files = [pdf_file for _, pdf_file in page_files]
+        else:
+            pdf_files = [""] * len(page_meta_list)
 
-        if not page_files:
-            raise Exception("Failed to split PDF into pages")
+        if not bundle_text_files:
+            os.makedirs(os.path.join(output_dir, "text"), exist_ok=True)
 
-        total_pages = len(page_files)
-        logger.info(f"Split PDF into {total_pages} pages")
+        total_pages = len(pdf_files)
 
         # Step 2: Process pages in parallel
-        processing_tasks[document_id]["progress"] = 0.3
-        logger.info(f"Starting parallel processing of {total_pages} pages")
+        update_task(document_id, progress=0.3)
+        logger.info("Starting parallel processing of %d pages", total_pages)
 
-        page_results = []
+        # Results are stored by page index as they complete, so no final sort is needed
+        page_results: list[Optional[PageResult]] = [None] * total_pages
         all_quality_issues = []
+        # Full page texts, only collected when they are bundled into one archive
+        page_texts: Optional[Dict[int, str]] = {} if bundle_text_files else None
+
+        # Flag pages beyond the preliminary limits up front; only the rest are OCR'd
+        pages = []
+        for i, pdf_file in enumerate(pdf_files):
+            skip_reason = oversized_page_reason(i + 1, page_meta_list[i])
+            if skip_reason is None:
+                pages.append((i + 1, page_meta_list[i], pdf_file))
+                continue
+            page_result, page_issues = skipped_page_result(i + 1, pdf_file, skip_reason)
+            page_results[i] = page_result
+            all_quality_issues.extend(page_issues)
+
+        if len(pages) < total_pages:
+            logger.warning(
+                "Skipping %d oversized pages for document %s",
+                total_pages - len(pages),
+                document_id,
+            )
+
+        # Worker processes open the PDF themselves - hand them a path rather than
+        # pickling the whole document into every task
+        if process_pool is not None and isinstance(pdf_source, bytes):
+            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as spill:
+                spill.write(pdf_source)
+            spill_path = pdf_source = spill.name
 
-        # Use ThreadPoolExecutor for parallel processing with optimized parameters
+        # Use the shared process pool when configured, otherwise a per-document thread pool
         # Increased workers for maximum performance - target ~2s per page
-        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, total_pages)) as executor:
-            # Submit all page processing tasks with handwriting detection parameter
-            future_to_page = {
+        with (
+            nullcontext(process_pool)
+            if process_pool is not None
+            else ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS, len(pages))))
+        ) as executor:
+            # Worker processes take pages in batches so pickling and scheduling costs are
+            # shared; threads take one page per task for the finest load balancing
+            batch_size = (
+                max(1, len(pages) // (PROCESS_WORKERS * 4))
+                if process_pool is not None
+                else 1
+            )
+            future_to_pages = {
                 executor.submit(
-                    process_single_page,
-                    page_file,
-                    i + 1,
+                    process_page_batch,
+                    pdf_source,
+                    pages[start : start + batch_size],
                     output_dir,
                     filename_base,
                     language,
                     enable_handwriting_detection,
-                ): i
-                + 1
-                for i, page_file in enumerate(page_files)
+                    bundle_text_files,
+                ): pages[start : start + batch_size]
+                for start in range(0, len(pages), batch_size)
             }
 
-            # Collect results as they complete
-            completed_pages = 0
-            for future in concurrent.futures.as_completed(future_to_page):
-                page_number = future_to_page[future]
+            # Collect results as they complete; progress is published about every 5%
+            # of the document rather than on every page
+            completed_pages = total_pages - len(pages)
+            progress_step = max(1, total_pages // 20)
+            next_progress_at = completed_pages + progress_step
+            for future in concurrent.futures.as_completed(future_to_pages):
                 try:
-                    page_result, page_issues = future.result()
-                    page_results.append(page_result)
-                    all_quality_issues.extend(page_issues)
+                    batch_results = future.result()
+                except Exception as e:
+                    batch = future_to_pages[future]
+                    logger.error(
+                        "Pages %d-%d processing failed: %s", batch[0][0], batch[-1][0], e
+                    )
+                    # Add error results for every page of the failed batch
+                    batch_results = [
+                        failed_page_result(page_number, pdf_file, str(e))
+                        for page_number, _, pdf_file in batch
+                    ]
 
+                for page_result, page_issues, page_text in batch_results:
+                    if page_texts is not None and page_text is not None:
+                        page_texts[page_result.page_number] = page_text
+                    page_results[page_result.page_number - 1] = page_result
+                    all_quality_issues.extend(page_issues)
                     completed_pages += 1
-                    progress = 0.3 + (
-                        0.6 * completed_pages / total_pages
-                    )  # Progress from 0.3 to 0.9
-                    processing_tasks[document_id]["progress"] = progress
 
                     # Only log progress every 10 pages or for pages with issues to reduce log noise
                     if completed_pages % 10 == 0 or len(page_issues) > 0:
                         logger.info(
-                            f"Completed page {page_number}/{total_pages} ({completed_pages} total completed)"
+                            "Completed page %d/%d (%d total completed)",
+                            page_result.page_number,
+                            total_pages,
+                            completed_pages,
                         )
 
-                except Exception as e:
-                    logger.error(f"Page {page_number} processing failed: {e}")
-                    # Add error result for failed page
-                    error_issue = QualityIssue(
-                        issue_type="low_quality",
-                        page_number=page_number,
-                        severity="high",
-                        description=f"Page processing failed: {str(e)}",
-                        confidence=0.9,
-                    )
-
-                    error_page_result = PageResult(
-                        page_number=page_number,
-                        pdf_file=f"pdf/{filename_base}_page{page_number}.pdf",
-                        text_file="",
-                        quality_analysis={
-                            "page_number": page_number,
-                            "processing_error": str(e),
-                        },
-                        extracted_text="",
-                        issues=[error_issue],
-                    )
-
-                    page_results.append(error_page_result)
-                    all_quality_issues.append(error_issue)
-                    completed_pages += 1
+                if (
+                    completed_pages >= next_progress_at
+                    or completed_pages == total_pages
+                ):
+                    next_progress_at = completed_pages + progress_step
+                    progress = 0.3 + (
+                        0.6 * completed_pages / total_pages
+                    )  # Progress from 0.3 to 0.9
+                    update_task(document_id, progress=progress)
 
-        # Sort page results by page number to maintain order
-        page_results.sort(key=lambda x: x.page_number)
+        logger.info("Parallel processing completed for %d pages", total_pages)
 
-        logger.info(f"Parallel processing completed for {total_pages} pages")
+        if page_texts is not None:
+            archive_path = os.path.join(output_dir, f"{filename_base}_text.tar")
+            write_text_archive(archive_path, filename_base, page_texts)
+            logger.info("Page text archived to: %s", archive_path)
 
         processing_time = time.time() - start_time
 
         # Save analysis results as JSON file
-        response_data = {
+        summary = {
             "document_id": document_id,
             "status": "completed",
             "processing_time": processing_time,
-            "quality_issues": [issue.dict() for issue in all_quality_issues],
             "total_pages": total_pages,
             "issues_detected": len(all_quality_issues) > 0,
-            "pages": [page.dict() for page in page_results],
             "output_directory": output_dir,
         }
 
         json_output_path = os.path.join(output_dir, f"{filename_base}_analysis.json")
-        with open(json_output_path, "w", encoding="utf-8") as f:
-            json.dump(response_data, f, indent=2, ensure_ascii=False)
-        logger.info(f"Analysis results saved to: {json_output_path}")
+        write_analysis_json(
+            json_output_path,
+            summary,
+            {"quality_issues": all_quality_issues, "pages": page_results},
+        )
+        logger.info("Analysis results saved to: %s", json_output_path)
 
         # Create response with per-page analysis
         response = ProcessingResponse(
@@ -1284,74 +1459,105 @@ def process_pdf_with_per_page_analysis(
         )
 
         # Update task status
-        processing_tasks[document_id]["status"] = "completed"
-        processing_tasks[document_id]["progress"] = 1.0
-        processing_tasks[document_id]["result"] = response
-        processing_tasks[document_id]["updated_at"] = datetime.now()
+        update_task(document_id, status="completed", progress=1.0, result=response)
 
         logger.info(
-            f"Document {document_id} processed successfully in {processing_time:.2f}s with {len(all_quality_issues)} total issues detected across {total_pages} pages (handwriting detection: {'enabled' if enable_handwriting_detection else 'disabled'})"
+            "Document %s processed successfully in %.2fs with %d total issues detected across %d pages (handwriting detection: %s)",
+            document_id,
+            processing_time,
+            len(all_quality_issues),
+            total_pages,
+            "enabled" if enable_handwriting_detection else "disabled",
         )
 
         return response
 
     except Exception as e:
         error_msg = f"Error processing document: {str(e)}"
-        logger.error(f"Document {document_id} processing failed: {error_msg}")
+        logger.error("Document %s processing failed: %s", document_id, error_msg)
 
         # Update task status with error
-        processing_tasks[document_id]["status"] = "failed"
-        processing_tasks[document_id]["error"] = error_msg
-        processing_tasks[document_id]["updated_at"] = datetime.now()
+        update_task(document_id, status="failed", error=error_msg)
 
         return ProcessingResponse(
             document_id=document_id, status="failed", error=error_msg
         )
 
+    finally:
+        if spill_path is not None and os.path.exists(spill_path):
+            os.remove(spill_path)
+
 
 async def process_document_async(
     document_id: str,
-    input_path: str,
+    pdf_source: Union[str, bytes],
     output_dir: str,
     filename_base: str,
     language: str = "vie",
     enable_handwriting_detection: bool = False,
+    export_page_pdfs: bool = True,
+    bundle_text_files: bool = False,
+    source_url: Optional[str] = None,
 ):
     """Async wrapper for per-page document processing with quality analysis"""
+    # URL inputs are fetched here so the request returns without waiting on the download
+    if source_url is not None and not await download_file(source_url, pdf_source):
+        error_msg = "Failed to download file from URL"
+        logger.error("Document %s processing failed: %s", document_id, error_msg)
+        update_task(document_id, status="failed", error=error_msg)
+        if os.path.exists(pdf_source):
+            os.remove(pdf_source)
+        return ProcessingResponse(
+            document_id=document_id, status="failed", error=error_msg
+        )
+
     loop = asyncio.get_event_loop()
     result = await loop.run_in_executor(
         thread_pool,
         process_pdf_with_per_page_analysis,
         document_id,
-        input_path,
+        pdf_source,
         output_dir,
         filename_base,
         language,
         enable_handwriting_detection,
+        export_page_pdfs,
+        bundle_text_files,
     )
 
-    # Clean up temporary input file
-    try:
-        if os.path.exists(input_path):
-            os.remove(input_path)
-    except Exception as e:
-        logger.warning(f"Failed to clean up temporary file {input_path}: {e}")
+    # Clean up temporary input file (in-memory uploads have none)
+    if isinstance(pdf_source, str):
+        try:
+            if os.path.exists(pdf_source):
+                os.remove(pdf_source)
+        except Exception as e:
+            logger.warning("Failed to clean up temporary file %s: %s", pdf_source, e)
 
     return result
 
 
+API_INFO = {
+    "message": "PDF Processing API",
+    "version": "1.0.0",
+    "endpoints": {
+        "transform": "/documents/transform",
+        "status": "/documents/status/{document_id}",
+        "batch_status": "/documents/status/batch?ids={id1},{id2}",
+        "events": "/documents/events/{document_id}",
+        "health": "/health",
+    },
+}
+# The API info never changes while the server runs, so its ETag is computed once
+API_INFO_ETAG = '"%s"' % hashlib.blake2b(orjson.dumps(API_INFO), digest_size=12).hexdigest()
+
+
 @app.get("/")
-async def root():
+async def root(request: Request, response: Response):
     """Root endpoint"""
-    return {
-        "message": "PDF Processing API",
-        "version": "1.0.0",
-        "endpoints": {
-            "transform": "/documents/transform",
-            "status": "/documents/status/{document_id}",
-            "health": "/health",
-        },
-    }
+    if is_not_modified(request, API_INFO_ETAG):
+        return Response(status_code=304, headers={"ETag": API_INFO_ETAG})
+    response.headers["ETag"] = API_INFO_ETAG
+    return API_INFO
 
 
 @app.post("/documents/transform", response_model=ProcessingResponse)
@@ -1366,6 +1572,12 @@ async def transform_document(
     relative_input_path: Optional[str] = Form(
         None
     ),  # NEW: Relative path for nested output structure
+    export_page_pdfs: Optional[bool] = Form(
+        True
+    ),  # Write a single-page PDF per page to the pdf/ subdirectory
+    bundle_text_files: Optional[bool] = Form(
+        False
+    ),  # Write all page text files into one tar instead of one file per page
 ):
     """Transform document endpoint - accepts file upload or URL with language specification
 
@@ -1375,20 +1587,24 @@ async def transform_document(
     - language: OCR language code (default: 'vie' for Vietnamese)
     - enable_handwriting_detection: Enable handwriting detection (default: False, improves performance when disabled)
     - relative_input_path: Relative path from input root to maintain folder hierarchy in output (optional)
+    - export_page_pdfs: Write per-page PDF files to the pdf/ subdirectory (default: True, disable to skip splitting)
+    - bundle_text_files: Write page text into {filename}_text.tar instead of separate text/ files (default: False)
 
     Supported languages: vie (Vietnamese), eng (English), vie+eng (Vietnamese + English)
     Note: Handwriting detection is resource-intensive and should only be enabled when needed.
     """
     document_id = str(uuid.uuid4())
+    source_url = None
 
     try:
         # Initialize task
-        processing_tasks[document_id] = {
-            "status": "pending",
-            "progress": 0.0,
-            "created_at": datetime.now(),
-            "updated_at": datetime.now(),
-        }
+        with processing_tasks_lock:
+            processing_tasks[document_id] = {
+                "status": "pending",
+                "progress": 0.0,
+                "created_at": datetime.now(),
+                "updated_at": datetime.now(),
+            }
 
         # Determine input source
         if file and file.filename:
@@ -1399,13 +1615,18 @@ async def transform_document(
                 )
 
             filename = file.filename
-            input_path = f"temp_{document_id}_{filename}"
 
-            # Save uploaded file
-            if not await save_upload_file(file, input_path):
-                raise HTTPException(
-                    status_code=500, detail="Failed to save uploaded file"
-                )
+            if file.size is not None and file.size <= STREAMING_THRESHOLD:
+                # Keep the PDF in memory end-to-end - pages are rendered from these bytes
+                pdf_source = await file.read()
+            else:
+                pdf_source = f"temp_{document_id}_{filename}"
+
+                # Save large uploads to disk rather than holding them in memory
+                if not await save_upload_file(file, pdf_source):
+                    raise HTTPException(
+                        status_code=500, detail="Failed to save uploaded file"
+                    )
 
         elif url_data:
             # URL download
@@ -1419,13 +1640,9 @@ async def transform_document(
             if not url:
                 raise HTTPException(status_code=400, detail="URL is required")
 
-            input_path = f"temp_{document_id}_{filename}"
-
-            # Download file
-            if not await download_file(url, input_path):
-                raise HTTPException(
-                    status_code=500, detail="Failed to download file from URL"
-                )
+            # Downloaded by the background task before processing starts
+            pdf_source = f"temp_{document_id}_{filename}"
+            source_url = url
         else:
             raise HTTPException(
                 status_code=400, detail="Either file upload or URL must be provided"
@@ -1454,20 +1671,25 @@ async def transform_document(
         document_output_dir.mkdir(parents=True, exist_ok=True)
 
         # Create subdirectories for organized file storage
-        text_dir = document_output_dir / "text"
-        pdf_dir = document_output_dir / "pdf"
-        text_dir.mkdir(exist_ok=True)
-        pdf_dir.mkdir(exist_ok=True)
+        if not bundle_text_files:
+            text_dir = document_output_dir / "text"
+            text_dir.mkdir(exist_ok=True)
+        if export_page_pdfs:
+            pdf_dir = document_output_dir / "pdf"
+            pdf_dir.mkdir(exist_ok=True)
 
         # Start background processing with optimization parameters
         background_tasks.add_task(
             process_document_async,
             document_id,
-            input_path,
+            pdf_source,
             str(document_output_dir),
             filename_base,
             language,
             enable_handwriting_detection,
+            export_page_pdfs,
+            bundle_text_files,
+            source_url,
         )
 
         # Return immediate response
@@ -1477,25 +1699,19 @@ async def transform_document(
 
     except HTTPException:
         # Clean up task if it was created
-        if document_id in processing_tasks:
-            del processing_tasks[document_id]
+        with processing_tasks_lock:
+            processing_tasks.pop(document_id, None)
         raise
     except Exception as e:
         # Clean up task if it was created
-        if document_id in processing_tasks:
-            del processing_tasks[document_id]
-        logger.error(f"Unexpected error in transform_document: {e}")
+        with processing_tasks_lock:
+            processing_tasks.pop(document_id, None)
+        logger.error("Unexpected error in transform_document: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@app.get("/documents/status/{document_id}", response_model=TaskStatus)
-async def get_document_status(document_id: str):
-    """Get document processing status"""
-    if document_id not in processing_tasks:
-        raise HTTPException(status_code=404, detail="Document not found")
-
-    task_info = processing_tasks[document_id]
-
+def task_status(document_id: str, task_info: Dict[str, Any]) -> TaskStatus:
+    """Build the status response for a task snapshot"""
     return TaskStatus(
         task_id=document_id,
         status=task_info["status"],
@@ -1507,13 +1723,128 @@ async def get_document_status(document_id: str):
     )
 
 
+def status_etag(tasks: Dict[str, Optional[Dict[str, Any]]]) -> str:
+    """ETag for a set of task snapshots - every update bumps updated_at, so it changes with any field"""
+    versions = ",".join(
+        f"{document_id}:{task_info['updated_at'].isoformat() if task_info else '-'}"
+        for document_id, task_info in tasks.items()
+    )
+    return '"%s"' % hashlib.blake2b(versions.encode(), digest_size=12).hexdigest()
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Whether the client's If-None-Match already names this ETag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in (
+        tag.strip() for tag in if_none_match.split(",")
+    )
+
+
+# Declared before /documents/status/{document_id} so "batch" is not taken as an ID
+@app.get(
+    "/documents/status/batch", response_model=Dict[str, Optional[TaskStatus]]
+)
+async def get_document_statuses(ids: str, request: Request, response: Response):
+    """Get the processing status of several comma-separated documents; unknown IDs map to null"""
+    tasks = {document_id: get_task(document_id) for document_id in ids.split(",")}
+    etag = status_etag(tasks)
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    return {
+        document_id: task_status(document_id, task_info) if task_info is not None else None
+        for document_id, task_info in tasks.items()
+    }
+
+
+@app.get("/documents/status/{document_id}", response_model=TaskStatus)
+async def get_document_status(
+    document_id: str, request: Request, response: Response, wait: float = 0
+):
+    """Get document processing status; answers 304 when If-None-Match matches the current ETag.
+
+    With ?wait=N and If-None-Match, holds the request up to N seconds until the task changes.
+    """
+    if wait > 0 and not request.headers.get("if-none-match"):
+        # Without an ETag there is nothing to wait against
+        raise HTTPException(
+            status_code=400, detail="wait requires an If-None-Match header"
+        )
+
+    task_info = get_task(document_id)
+    if task_info is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    etag = status_etag({document_id: task_info})
+    if wait > 0 and is_not_modified(request, etag):
+        deadline = time.monotonic() + min(wait, STATUS_WAIT_MAX)
+        with status_listener(document_id) as changed:
+            while True:
+                # Re-read after registering (and after each wake-up) so no update is missed
+                changed.clear()
+                task_info = get_task(document_id)
+                if task_info is None:
+                    raise HTTPException(status_code=404, detail="Document not found")
+                etag = status_etag({document_id: task_info})
+                remaining = deadline - time.monotonic()
+                if not is_not_modified(request, etag) or remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(changed.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    return task_status(document_id, task_info)
+
+
+@app.get("/documents/events/{document_id}")
+async def stream_document_status(document_id: str):
+    """Stream status changes as server-sent events until the document completes or fails"""
+    if get_task(document_id) is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    async def status_events():
+        # update_task pushes a wake-up instead of this stream polling the task table
+        with status_listener(document_id) as changed:
+            last_update = None
+            while True:
+                # Clear before reading so an update made in between is not missed
+                changed.clear()
+                task_info = get_task(document_id)
+                if task_info is None:
+                    return  # Expired from the task table
+                if task_info["updated_at"] != last_update:
+                    last_update = task_info["updated_at"]
+                    status = task_status(document_id, task_info).model_dump_json()
+                    yield f"data: {status}\n\n"
+                if task_info["status"] in ("completed", "failed"):
+                    return
+                try:
+                    await asyncio.wait_for(changed.wait(), STATUS_EVENT_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        status_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "active_tasks": len(processing_tasks),
+        "active_tasks": get_task_count(),
     }
 
 
@@ -7,6 +7,7 @@ import json
 import time
 from pathlib import Path
 
+import orjson
 import requests
 
 # API configuration
@@ -65,7 +66,7 @@ def test_realtime_api():
                 )
 
                 if status_response.status_code == 200:
-                    status_data = status_response.json()
+                    status_data = orjson.loads(status_response.content)
                     elapsed = time.time() - start_time
 
                     if status_data["status"] == "completed":
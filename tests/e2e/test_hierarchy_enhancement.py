@@ -8,6 +8,7 @@ import json
 import time
 from pathlib import Path
 
+import orjson
 import requests
 
 # Import test configuration
@@ -88,7 +89,7 @@ def test_hierarchy_enhancement():
                         f"{API_BASE_URL}/documents/status/{document_id}"
                     )
                     if status_response.status_code == 200:
-                        status_data = status_response.json()
+                        status_data = orjson.loads(status_response.content)
                         if status_data["status"] == "completed":
                             print("✅ Processing completed!")
                             if "result" in status_data and status_data["result"]:
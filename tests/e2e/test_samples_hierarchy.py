@@ -7,6 +7,7 @@ import json
 import time
 from pathlib import Path
 
+import orjson
 import requests
 
 # Import test configuration
@@ -87,13 +88,14 @@ def test_samples_hierarchy():
                 # Wait for processing to complete
                 print("⏳ Waiting for processing...")
                 start_time = time.time()
+                last_reported = None
 
                 while True:
                     status_response = requests.get(
                         f"{API_BASE_URL}/documents/status/{document_id}"
                     )
                     if status_response.status_code == 200:
-                        status_data = status_response.json()
+                        status_data = orjson.loads(status_response.content)
                         elapsed_time = time.time() - start_time
 
                         if status_data["status"] == "completed":
@@ -142,27 +144,31 @@ def test_samples_hierarchy():
                             break
                         else:
                             progress = status_data.get("progress", 0)
-                            # Calculate estimated time to completion
-                            if progress > 0:
-                                estimated_total = elapsed_time / progress
-                                estimated_remaining = estimated_total - elapsed_time
-
-                                # Show page info if available
-                                page_info = ""
-                                if "result" in status_data and status_data["result"]:
-                                    total_pages = status_data["result"].get(
-                                        "total_pages", 0
-                                    )
-                                    if total_pages > 0:
-                                        page_info = f" | Pages: {total_pages}"
+                            # Only report when status or progress moves, not on every poll
+                            reported = (status_data["status"], round(progress, 2))
+                            if reported != last_reported:
+                                last_reported = reported
+                                # Calculate estimated time to completion
+                                if progress > 0:
+                                    estimated_total = elapsed_time / progress
+                                    estimated_remaining = estimated_total - elapsed_time
+
+                                    # Show page info if available
+                                    page_info = ""
+                                    if "result" in status_data and status_data["result"]:
+                                        total_pages = status_data["result"].get(
+                                            "total_pages", 0
+                                        )
+                                        if total_pages > 0:
+                                            page_info = f" | Pages: {total_pages}"
 
-                                print(
-                                    f"⏳ Status: {status_data['status']} ({progress:.1%}){page_info} - Elapsed: {elapsed_time:.1f}s, ETA: {estimated_remaining:.1f}s"
-                                )
-                            else:
-                                print(
-                                    f"⏳ Status: {status_data['status']} ({progress:.1%}) - Elapsed: {elapsed_time:.1f}s"
-                                )
+                                    print(
+                                        f"⏳ Status: {status_data['status']} ({progress:.1%}){page_info} - Elapsed: {elapsed_time:.1f}s, ETA: {estimated_remaining:.1f}s"
+                                    )
+                                else:
+                                    print(
+                                        f"⏳ Status: {status_data['status']} ({progress:.1%}) - Elapsed: {elapsed_time:.1f}s"
+                                    )
                             time.sleep(2)
                     else:
                         print(f"❌ Failed to get status: {status_response.status_code}")
@@ -4,10 +4,14 @@ Run integration tests with a separate output directory to avoid cluttering the m
 """
 
 import os
+import signal
 import subprocess
 import sys
 from pathlib import Path
 
+# The suite waits on OCR jobs of up to 5 minutes each; anything beyond this is wedged
+RUN_TIMEOUT = 30 * 60
+
 
 def main():
     # Set environment variable for test output directory
@@ -21,15 +25,24 @@ def main():
     print(f"📁 Test output will be saved to: {test_output_dir.absolute()}")
 
     try:
-        # Run the integration tests
-        result = subprocess.run(
-            [sys.executable, "tests/integration_test.py"],
+        # Run the integration tests in their own process group so a timeout or
+        # Ctrl-C also stops any children they started
+        proc = subprocess.Popen(
+            [sys.executable, "tests/integration/integration_test.py"],
             cwd=os.getcwd(),
-            capture_output=False,
             text=True,
+            start_new_session=True,
         )
-
-        if result.returncode == 0:
+        try:
+            proc.wait(timeout=RUN_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            print(f"\n⏰ Integration tests timed out after {RUN_TIMEOUT}s")
+        finally:
+            if proc.poll() is None:
+                os.killpg(proc.pid, signal.SIGKILL)
+                proc.wait()
+
+        if proc.returncode == 0:
             print("\n✅ Integration tests completed successfully!")
             print(f"📁 Test outputs are in: {test_output_dir.absolute()}")
             print("💡 Your main 'output' directory remains clean.")
@@ -40,7 +53,7 @@ def main():
         print(f"\n❌ Error running tests: {e}")
         return 1
 
-    return result.returncode
+    return proc.returncode
 
 
 if __name__ == "__main__":
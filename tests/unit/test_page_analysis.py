@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the per-page text and image analysis helpers in the OCR API.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+# The API module pulls in PyMuPDF, NumPy and FastAPI at import time
+fitz = pytest.importorskip("fitz")
+np = pytest.importorskip("numpy")
+api = pytest.importorskip("src.api.v1.api")
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Xin chào thế giới, đây là một trang văn bản.", 0),
+        ("Lỗi mã hóa ??? và ????", 2),
+        ("abc ¤¤¤¤¤ def", 1),
+        ("\x01\x02\x03 ok", 1),
+        # A control-character run also matches the non-Vietnamese pattern and counts once per pattern
+        ("\x01\x02\x03\x04\x05", 2),
+    ],
+)
+def test_garbled_text_score(text, expected):
+    assert api.garbled_text_score(text) == expected
+
+
+def test_otsu_threshold_splits_bimodal_image():
+    rng = np.random.default_rng(0)
+    ink = rng.normal(60, 10, 5000)
+    paper = rng.normal(190, 10, 15000)
+    gray = np.clip(np.concatenate([ink, paper]), 0, 255).astype(np.uint8)
+
+    threshold = api.otsu_threshold(gray)
+
+    # Any threshold in the empty gap between the two modes separates them equally well
+    assert 60 < threshold < 190
+    assert (gray[:5000] <= threshold).all()
+    assert (gray[5000:] > threshold).all()
+
+
+def skewed_lines(angle: float, size: int = 800) -> np.ndarray:
+    """Draw an ink mask of evenly spaced text-like lines sloped by angle degrees"""
+    ink = np.zeros((size, size), dtype=bool)
+    xs = np.arange(50, size - 50)
+    slope = np.tan(np.radians(angle))
+    for y0 in range(100, size - 100, 40):
+        ys = np.rint(y0 + xs * slope).astype(int)
+        for thickness in range(3):
+            ink[ys + thickness, xs] = True
+    return ink
+
+
+@pytest.mark.parametrize("angle", [-4.0, -2.0, 2.0, 3.0, 5.0])
+def test_estimate_skew_angle_recovers_signed_angle(angle):
+    # Positive angles are lines descending to the right, as preprocess_page_image expects
+    assert api.estimate_skew_angle(skewed_lines(angle)) == pytest.approx(angle, abs=0.3)
+
+
+def test_estimate_skew_angle_level_text():
+    assert api.estimate_skew_angle(skewed_lines(0.0)) == 0.0
+
+
+def test_has_usable_text_layer_digital_and_scanned_pages():
+    doc = fitz.open()
+    doc.new_page().insert_textbox(
+        fitz.Rect(50, 50, 550, 750),
+        "Quarterly report on document processing throughput. " * 10,
+    )
+    image = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 200, 200), False)
+    image.clear_with(255)
+    scanned = doc.new_page()
+    scanned.insert_image(scanned.rect, pixmap=image)
+
+    assert api.has_usable_text_layer(doc[0].get_text())
+    assert not api.has_usable_text_layer(doc[1].get_text())
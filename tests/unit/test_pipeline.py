@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the per-page processing pipeline, run on small generated PDFs.
+"""
+
+import json
+import multiprocessing
+import sys
+import tarfile
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+# The API module pulls in PyMuPDF, NumPy and FastAPI at import time
+fitz = pytest.importorskip("fitz")
+api = pytest.importorskip("src.api.v1.api")
+
+pytestmark = pytest.mark.unit
+
+# Text-layer pages are read without OCR, so these tests do not need Tesseract
+PAGE_TEXT = "Page {number} of the quarterly report on document processing throughput. "
+
+
+def build_pdf(page_count: int) -> bytes:
+    """Build a PDF whose pages all carry a usable text layer"""
+    with fitz.open() as doc:
+        for number in range(1, page_count + 1):
+            doc.new_page().insert_textbox(
+                fitz.Rect(50, 50, 550, 750), PAGE_TEXT.format(number=number) * 5
+            )
+        return doc.tobytes()
+
+
+@pytest.fixture
+def document_id():
+    """Register a pending task the pipeline reports progress to, as transform does"""
+    document_id = str(uuid.uuid4())
+    with api.processing_tasks_lock:
+        api.processing_tasks[document_id] = {
+            "status": "pending",
+            "progress": 0.0,
+            "created_at": datetime.now(),
+            "updated_at": datetime.now(),
+        }
+    yield document_id
+    with api.processing_tasks_lock:
+        api.processing_tasks.pop(document_id, None)
+
+
+def run_pipeline(document_id, pdf_source, output_dir, **options):
+    return api.process_pdf_with_per_page_analysis(
+        document_id,
+        pdf_source,
+        str(output_dir),
+        "report",
+        language="eng",
+        export_page_pdfs=False,
+        **options,
+    )
+
+
+def skip_issues(response):
+    return [
+        issue
+        for issue in response.quality_issues
+        if issue.description.startswith("Oversized page skipped")
+    ]
+
+
+A4_PAGE = {"rotation": 0, "width": 595.0, "height": 842.0, "file_size": 50_000}
+
+
+def test_oversized_page_reason_within_limits():
+    assert api.oversized_page_reason(1, A4_PAGE) is None
+
+
+def test_oversized_page_reason_page_limit(monkeypatch):
+    monkeypatch.setattr(api, "MAX_PDF_PAGES", 2)
+
+    assert api.oversized_page_reason(2, A4_PAGE) is None
+    assert api.oversized_page_reason(3, A4_PAGE) == "document exceeds 2 pages"
+
+
+def test_oversized_page_reason_page_bytes(monkeypatch):
+    monkeypatch.setattr(api, "MAX_PAGE_BYTES", 1024 * 1024)
+
+    reason = api.oversized_page_reason(1, {**A4_PAGE, "file_size": 3 * 1024 * 1024})
+
+    assert reason == "page is 3.0MB"
+
+
+def test_oversized_page_reason_page_pixels(monkeypatch):
+    monkeypatch.setattr(api, "MAX_PAGE_PIXELS", 1_000_000)
+
+    assert api.oversized_page_reason(1, A4_PAGE).startswith("page renders to ")
+
+
+def test_skipped_page_result():
+    page_result, issues = api.skipped_page_result(4, "pdf/report_page4.pdf", "too big")
+
+    assert page_result.page_number == 4
+    assert page_result.pdf_file == "pdf/report_page4.pdf"
+    assert page_result.text_file == ""
+    assert page_result.extracted_text == ""
+    assert page_result.quality_analysis == {"page_number": 4, "skipped": "too big"}
+    assert page_result.issues == issues
+    assert len(issues) == 1
+    assert issues[0].issue_type == "low_quality"
+    assert issues[0].severity == "high"
+    assert issues[0].page_number == 4
+    assert issues[0].description == "Oversized page skipped: too big"
+
+
+def test_pipeline_reads_text_layer_pages(tmp_path, document_id):
+    response = run_pipeline(document_id, build_pdf(3), tmp_path)
+
+    assert response.status == "completed"
+    assert response.total_pages == 3
+    assert [page.page_number for page in response.pages] == [1, 2, 3]
+    for page in response.pages:
+        assert page.quality_analysis["ocr_skipped"] is True
+        assert PAGE_TEXT.format(number=page.page_number) in page.extracted_text
+        text_file = tmp_path / page.text_file
+        assert text_file.read_text(encoding="utf-8").startswith(
+            PAGE_TEXT.format(number=page.page_number)
+        )
+    assert skip_issues(response) == []
+    assert api.get_task(document_id)["status"] == "completed"
+
+
+def test_pipeline_skips_pages_beyond_limit(tmp_path, document_id, monkeypatch):
+    monkeypatch.setattr(api, "MAX_PDF_PAGES", 2)
+
+    response = run_pipeline(document_id, build_pdf(3), tmp_path)
+
+    assert response.status == "completed"
+    assert response.total_pages == 3
+    assert PAGE_TEXT.format(number=2) in response.pages[1].extracted_text
+    skipped = response.pages[2]
+    assert skipped.page_number == 3
+    assert skipped.extracted_text == ""
+    assert skipped.quality_analysis["skipped"] == "document exceeds 2 pages"
+    assert [issue.page_number for issue in skip_issues(response)] == [3]
+    assert not (tmp_path / "text" / "report_page3.txt").exists()
+
+
+def test_pipeline_skips_every_page_over_pixel_limit(tmp_path, document_id, monkeypatch):
+    monkeypatch.setattr(api, "MAX_PAGE_PIXELS", 1_000_000)
+
+    response = run_pipeline(document_id, build_pdf(2), tmp_path)
+
+    assert response.status == "completed"
+    assert all(page.extracted_text == "" for page in response.pages)
+    assert [issue.page_number for issue in skip_issues(response)] == [1, 2]
+
+
+def worker_holds_document() -> bool:
+    """Whether the calling pool worker still has a source document open"""
+    return getattr(api.page_doc_cache, "entry", None) is not None
+
+
+@pytest.mark.slow
+def test_pipeline_process_pool_batches(tmp_path, document_id, monkeypatch):
+    with ProcessPoolExecutor(
+        max_workers=1, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        monkeypatch.setattr(api, "process_pool", pool)
+        monkeypatch.setattr(api, "PROCESS_WORKERS", 1)
+
+        # In-memory uploads are spilled to a temporary file for the worker processes
+        response = run_pipeline(document_id, build_pdf(5), tmp_path)
+        # The worker must not keep the (now deleted) spill file open after the job
+        assert pool.submit(worker_holds_document).result() is False
+
+    assert response.status == "completed"
+    assert [page.page_number for page in response.pages] == [1, 2, 3, 4, 5]
+    for page in response.pages:
+        assert PAGE_TEXT.format(number=page.page_number) in page.extracted_text
+
+
+def test_write_analysis_json_matches_model_dump(tmp_path):
+    issues = [
+        api.QualityIssue(
+            issue_type="skew",
+            page_number=1,
+            severity="low",
+            description='Skewed "1.5" degrees',
+            confidence=0.15,
+        )
+    ]
+    pages, _ = zip(*(api.skipped_page_result(n, "", "too big") for n in (1, 2)))
+    summary = {"document_id": "doc", "total_pages": 2, "processing_time": 1.25}
+    json_path = tmp_path / "analysis.json"
+
+    api.write_analysis_json(
+        str(json_path),
+        summary,
+        {"quality_issues": issues, "empty": [], "pages": list(pages)},
+    )
+
+    with open(json_path, encoding="utf-8") as f:
+        written = json.load(f)
+    assert written == {
+        **summary,
+        "quality_issues": [issue.model_dump() for issue in issues],
+        "empty": [],
+        "pages": [page.model_dump() for page in pages],
+    }
+
+
+def test_pipeline_analysis_json_matches_response(tmp_path, document_id):
+    response = run_pipeline(document_id, build_pdf(2), tmp_path)
+
+    with open(tmp_path / "report_analysis.json", encoding="utf-8") as f:
+        written = json.load(f)
+    expected = response.model_dump(mode="json")
+    for key in ("document_id", "total_pages", "issues_detected", "quality_issues", "pages"):
+        assert written[key] == expected[key]
+
+
+def test_pipeline_bundles_page_text_into_archive(tmp_path, document_id):
+    pdf_bytes = build_pdf(3)
+
+    response = run_pipeline(document_id, pdf_bytes, tmp_path, bundle_text_files=True)
+
+    assert response.status == "completed"
+    assert not (tmp_path / "text").exists()
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        expected = {
+            f"text/report_page{number}.txt": doc[number - 1].get_text()
+            for number in (1, 2, 3)
+        }
+    with tarfile.open(tmp_path / "report_text.tar") as tar:
+        assert tar.getnames() == list(expected)
+        for name, text in expected.items():
+            assert tar.extractfile(name).read().decode("utf-8") == text
+    assert [page.text_file for page in response.pages] == list(expected)
+
+
+def test_untexted_image_regions_skips_images_under_text():
+    image = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 100, 100), False)
+    image.clear_with(200)
+    with fitz.open() as doc:
+        page = doc.new_page()
+        # A photo of text the text layer does not cover, and a background image the text sits on
+        uncovered = fitz.Rect(100, 450, 500, 750)
+        page.insert_image(uncovered, pixmap=image)
+        page.insert_image(fitz.Rect(50, 50, 550, 300), pixmap=image)
+        # Too small to be worth OCR'ing on its own
+        page.insert_image(fitz.Rect(520, 770, 540, 790), pixmap=image)
+        page.insert_textbox(
+            fitz.Rect(60, 60, 540, 290), PAGE_TEXT.format(number=1) * 5
+        )
+
+        regions = api.untexted_image_regions(page)
+
+    assert regions == [uncovered]
+
+
+def test_text_layer_page_ocrs_only_uncovered_images(tmp_path, monkeypatch):
+    image = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 100, 100), False)
+    image.clear_with(200)
+    with fitz.open() as doc:
+        page = doc.new_page()
+        page.insert_image(fitz.Rect(100, 450, 500, 750), pixmap=image)
+        page.insert_textbox(fitz.Rect(50, 50, 550, 400), PAGE_TEXT.format(number=1) * 5)
+        pdf_bytes = doc.tobytes()
+
+    ocr_sizes = []
+
+    def fake_ocr_image(region_image, language):
+        ocr_sizes.append(region_image.size)
+        return "Text inside the photo", []
+
+    monkeypatch.setattr(api, "ocr_image", fake_ocr_image)
+
+    text, analysis, _ = api.optimized_ocr_with_quality_analysis(
+        pdf_bytes, 1, str(tmp_path / "page1.txt"), "eng"
+    )
+
+    assert analysis["ocr_skipped"] is True
+    assert analysis["ocr_regions"] == 1
+    # Only the 400x300pt image region is rendered and OCR'd, not the whole page
+    zoom = api.OCR_RENDER_DPI / 72
+    assert len(ocr_sizes) == 1
+    assert ocr_sizes[0] == pytest.approx((400 * zoom, 300 * zoom), abs=2)
+    assert text.startswith(PAGE_TEXT.format(number=1))
+    assert text.endswith("\n\nText inside the photo")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the document status endpoints: ETags, 304 responses and long-polling.
+"""
+
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+# TestClient needs httpx; the API module pulls in PyMuPDF, NumPy and FastAPI at import time
+pytest.importorskip("httpx")
+api = pytest.importorskip("src.api.v1.api")
+from fastapi.testclient import TestClient  # noqa: E402
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture
+def client():
+    return TestClient(api.app)
+
+
+@pytest.fixture
+def document_id():
+    """Seed a processing task straight into the task table, as transform does"""
+    document_id = str(uuid.uuid4())
+    with api.processing_tasks_lock:
+        api.processing_tasks[document_id] = {
+            "status": "processing",
+            "progress": 0.25,
+            "created_at": datetime.now(),
+            "updated_at": datetime.now(),
+        }
+    yield document_id
+    with api.processing_tasks_lock:
+        api.processing_tasks.pop(document_id, None)
+
+
+def test_status_carries_etag(client, document_id):
+    response = client.get(f"/documents/status/{document_id}")
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] == api.status_etag(
+        {document_id: api.get_task(document_id)}
+    )
+    assert response.json()["progress"] == 0.25
+
+
+def test_matching_if_none_match_returns_304(client, document_id):
+    etag = client.get(f"/documents/status/{document_id}").headers["ETag"]
+
+    response = client.get(
+        f"/documents/status/{document_id}", headers={"If-None-Match": etag}
+    )
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+
+def test_update_during_wait_returns_new_status(client, document_id):
+    etag = client.get(f"/documents/status/{document_id}").headers["ETag"]
+    # Workers update tasks from their own threads while the request is held
+    updater = threading.Timer(
+        0.3, api.update_task, args=(document_id,), kwargs={"progress": 0.5}
+    )
+    updater.start()
+    try:
+        started = time.monotonic()
+        response = client.get(
+            f"/documents/status/{document_id}",
+            params={"wait": 10},
+            headers={"If-None-Match": etag},
+        )
+    finally:
+        updater.join()
+
+    assert response.status_code == 200
+    assert time.monotonic() - started < 10
+    assert response.headers["ETag"] != etag
+    assert response.json()["progress"] == 0.5
+
+
+def test_wait_times_out_with_304(client, document_id):
+    etag = client.get(f"/documents/status/{document_id}").headers["ETag"]
+
+    response = client.get(
+        f"/documents/status/{document_id}",
+        params={"wait": 0.2},
+        headers={"If-None-Match": etag},
+    )
+
+    assert response.status_code == 304
+
+
+def test_wait_without_if_none_match_is_rejected(client, document_id):
+    response = client.get(f"/documents/status/{document_id}", params={"wait": 5})
+
+    assert response.status_code == 400
+
+
+def test_batch_status_maps_unknown_ids_to_null(client, document_id):
+    unknown_id = str(uuid.uuid4())
+
+    response = client.get(
+        "/documents/status/batch", params={"ids": f"{document_id},{unknown_id}"}
+    )
+
+    assert response.status_code == 200
+    statuses = response.json()
+    assert statuses[document_id]["status"] == "processing"
+    assert statuses[unknown_id] is None
+
+    cached = client.get(
+        "/documents/status/batch",
+        params={"ids": f"{document_id},{unknown_id}"},
+        headers={"If-None-Match": response.headers["ETag"]},
+    )
+    assert cached.status_code == 304
+
+
+def test_cross_origin_clients_can_revalidate(client, document_id):
+    origin = "https://app.example.com"
+    preflight = client.options(
+        f"/documents/status/{document_id}",
+        headers={
+            "Origin": origin,
+            "Access-Control-Request-Method": "GET",
+            "Access-Control-Request-Headers": "If-None-Match",
+        },
+    )
+    assert preflight.status_code == 200
+
+    response = client.get(f"/documents/status/{document_id}", headers={"Origin": origin})
+    assert "etag" in response.headers["Access-Control-Expose-Headers"].lower()
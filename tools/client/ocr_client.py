@@ -7,79 +7,255 @@ Allows users to quickly process PDF files and view results.
 """
 
 import argparse
-import json
+import asyncio
+import functools
+import glob
+import hashlib
+import itertools
 import os
 import sys
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from requests_toolbelt.multipart.encoder import MultipartEncoder, MultipartEncoderMonitor
+from urllib3.util.retry import Retry
 from rich.console import Console
 from rich.table import Table
-from rich.progress import Progress, SpinnerColumn, TextColumn
+from rich.progress import BarColumn, Progress, SpinnerColumn, TaskProgressColumn, TextColumn
 from rich.panel import Panel
-from rich.syntax import Syntax
 
 console = Console()
 
+# Successful health checks are remembered across invocations for a few seconds, so scripts
+# that call the client once per file in quick succession skip the extra /health round-trip.
+# One file per server URL, in a private per-user cache directory
+HEALTH_CACHE_DIR = Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache") / "ocr_client"
+HEALTH_CACHE_TTL = 15
+
+# Upload files in chunks this size so large PDFs never sit in memory whole
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Status polling starts fast for short documents and backs off geometrically for long ones
+POLL_INITIAL_DELAY = 0.2
+POLL_MAX_DELAY = 10.0
+POLL_BACKOFF = 1.3
+PROCESSING_TIMEOUT = 3600
+# Each status request asks the server to hold it this long until the document changes
+STATUS_LONG_POLL = 60
+
+def print_section(renderable, title, border_style):
+    """Print a titled section - boxed in a Panel on a terminal, plain when output is piped"""
+    if console.is_terminal:
+        console.print(Panel(renderable, title=title, border_style=border_style))
+    else:
+        console.print(title)
+        console.print(renderable)
+
+def expand_paths(paths):
+    """Yield files from paths and glob patterns lazily, so uploads can start before a large glob is fully listed"""
+    for file_path in paths:
+        # A file that exists is taken literally, even if its name contains glob characters
+        if os.path.exists(file_path) or not any(c in file_path for c in '*?['):
+            yield file_path
+            continue
+        matched = False
+        for match in glob.iglob(file_path):
+            matched = True
+            yield match
+        if not matched:
+            console.print(f"[yellow]No files found matching pattern: {file_path}[/yellow]")
+
+def pdf_file_error(file_path):
+    """Return why a file cannot be uploaded as a PDF, or None - one open covers existence, size and header"""
+    try:
+        with open(file_path, 'rb') as fh:
+            if os.fstat(fh.fileno()).st_size == 0:
+                return "is empty"
+            # Readers tolerate junk before the %PDF- header within the first 1KB
+            if b'%PDF-' not in fh.read(1024):
+                return "is not a PDF"
+    except FileNotFoundError:
+        return "not found"
+    except OSError as e:
+        return f"cannot be read: {str(e)}"
+    return None
+
+def report_errors(func):
+    """Print request and file errors from an OCRClient call and return None instead of raising"""
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return func(self, *args, **kwargs)
+        except requests.exceptions.Timeout:
+            console.print("[red]Error: Request timed out[/red]")
+        except requests.exceptions.ConnectionError as e:
+            # The server is unreachable, so the next run must check its health again
+            self.forget_health()
+            console.print(f"[red]Error: {str(e)}[/red]")
+        except requests.exceptions.RequestException as e:
+            console.print(f"[red]Error: {str(e)}[/red]")
+        except OSError as e:
+            console.print(f"[red]Error: {str(e)}[/red]")
+        return None
+    return wrapper
+
 class OCRClient:
-    def __init__(self, base_url="http://localhost:8000"):
+    def __init__(self, base_url="http://localhost:8000", pool_size=20):
         self.base_url = base_url
         self.session = requests.Session()
+        # One pooled connection per concurrent upload, retrying gateway errors with backoff.
+        # Uploads are streamed and cannot be rewound, so only GETs are retried
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504],
+                              allowed_methods=["GET"])
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Connection": "keep-alive", "User-Agent": "ocr-client/1.0"})
+    
+    @property
+    def health_cache_path(self):
+        """Health cache file for this server URL"""
+        return HEALTH_CACHE_DIR / f"health-{hashlib.sha256(self.base_url.encode()).hexdigest()[:16]}"
+    
+    def forget_health(self):
+        """Drop the cached health check so the next run asks the server again"""
+        try:
+            self.health_cache_path.unlink()
+        except OSError:
+            pass
     
-    def check_server(self):
-        """Check if the OCR API server is running"""
+    def recently_healthy(self):
+        """Whether this user's cache records a successful health check within HEALTH_CACHE_TTL"""
+        path = self.health_cache_path
+        try:
+            st = path.stat()
+            # Only trust a file this user owns and nobody else can write
+            if hasattr(os, "getuid") and st.st_uid != os.getuid():
+                return False
+            if st.st_mode & 0o022:
+                return False
+            return time.time() - float(path.read_text()) < HEALTH_CACHE_TTL
+        except (OSError, ValueError):
+            return False
+    
+    def check_server(self, use_cache=True):
+        """Check if the OCR API server is running, trusting a successful check from the last few seconds"""
+        if use_cache and self.recently_healthy():
+            return True
+        
         try:
             response = self.session.get(f"{self.base_url}/health", timeout=5)
-            return response.status_code == 200
+            healthy = response.status_code == 200
         except requests.exceptions.RequestException:
+            healthy = False
+        if not healthy:
+            self.forget_health()
             return False
+        
+        try:
+            HEALTH_CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+            fd = os.open(self.health_cache_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                f.write(str(time.time()))
+        except OSError:
+            pass  # The cache is only an optimization
+        return True
     
-    def process_document(self, file_path, language="eng", enable_handwriting=False):
+    @report_errors
+    def process_document(self, file_path, language="eng", enable_handwriting=False, show_progress=True):
         """Process a PDF document through the OCR API"""
-        if not os.path.exists(file_path):
-            console.print(f"[red]Error: File '{file_path}' not found[/red]")
+        error = pdf_file_error(file_path)
+        if error:
+            console.print(f"[red]Error: File '{file_path}' {error}[/red]")
             return None
         
-        files = {'file': open(file_path, 'rb')}
-        data = {
-            'language': language,
-            'enable_handwriting_detection': str(enable_handwriting).lower()
-        }
-        
-        try:
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[progress.description]{task.description}"),
-                console=console
-            ) as progress:
-                task = progress.add_task("Processing document...", total=None)
-                
+        # One live line covers the upload (bytes sent) and then processing (server progress);
+        # rich allows only one live display at a time, so concurrent uploads skip it
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            TaskProgressColumn(),
+            console=console,
+            transient=True,
+            disable=not show_progress
+        ) as progress:
+            task = progress.add_task("Uploading document...", total=None)
+            
+            def on_read(monitor):
+                if monitor.bytes_read >= monitor.len:
+                    progress.update(task, description="Processing document...", total=1.0, completed=0)
+                else:
+                    progress.update(task, total=monitor.len, completed=monitor.bytes_read)
+            
+            with open(file_path, 'rb') as fh:
+                # Stream the multipart body from disk instead of building it in memory
+                encoder = MultipartEncoder(fields={
+                    'language': language,
+                    'enable_handwriting_detection': str(enable_handwriting).lower(),
+                    'file': (os.path.basename(file_path), fh, 'application/pdf')
+                })
+                monitor = MultipartEncoderMonitor(encoder, on_read if show_progress else None)
                 response = self.session.post(
                     f"{self.base_url}/documents/transform",
-                    files=files,
-                    data=data,
+                    data=monitor,
+                    headers={'Content-Type': monitor.content_type},
                     timeout=300  # 5 minute timeout
                 )
             
-            files['file'].close()
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
+            if response.status_code != 200:
                 console.print(f"[red]Error: API returned status {response.status_code}[/red]")
                 console.print(f"[red]{response.text}[/red]")
                 return None
-                
-        except requests.exceptions.Timeout:
-            console.print("[red]Error: Request timed out[/red]")
-            return None
-        except requests.exceptions.RequestException as e:
-            console.print(f"[red]Error: {str(e)}[/red]")
-            return None
-        finally:
-            if 'file' in files:
-                files['file'].close()
+            
+            # The upload only queues the document, so wait for it to be processed
+            document_id = orjson.loads(response.content)["document_id"]
+            return self.wait_for_result(
+                document_id,
+                lambda status: progress.update(task, completed=status['progress'])
+            )
+    
+    @report_errors
+    def wait_for_result(self, document_id, on_status=None):
+        """Wait for a submitted document to finish, returning its result or None on failure"""
+        etag = None
+        delay = POLL_INITIAL_DELAY
+        deadline = time.monotonic() + PROCESSING_TIMEOUT
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            # Long-poll once we hold an ETag: the server holds the request until the status differs from it
+            response = self.session.get(
+                f"{self.base_url}/documents/status/{document_id}",
+                params={'wait': STATUS_LONG_POLL} if etag else None,
+                headers={'If-None-Match': etag} if etag else None,
+                timeout=(5, STATUS_LONG_POLL + 10)
+            )
+            if response.status_code == 200:
+                etag = response.headers.get('ETag')
+                status = orjson.loads(response.content)
+                if status['status'] == 'completed':
+                    return status.get('result')
+                if status['status'] == 'failed':
+                    console.print(f"[red]Error: processing failed: {status.get('error', 'Unknown error')}[/red]")
+                    return None
+                if on_status:
+                    on_status(status)
+            elif response.status_code != 304:
+                console.print(f"[red]Error: status check returned {response.status_code}[/red]")
+                return None
+            # Servers without long-polling answer at once - back off instead of spinning
+            if time.monotonic() - started < 1:
+                time.sleep(delay)
+                delay = min(delay * POLL_BACKOFF, POLL_MAX_DELAY)
+        console.print(f"[red]Error: processing did not finish within {PROCESSING_TIMEOUT}s[/red]")
+        return None
     
     def display_results(self, result, file_path):
         """Display OCR results in a formatted way"""
@@ -101,7 +277,7 @@ class OCRClient:
         info_table.add_row("Total Pages", str(result.get('total_pages', 0)))
         info_table.add_row("Language", result.get('language', 'Unknown'))
         
-        console.print(Panel(info_table, title="📄 Document Information", border_style="blue"))
+        print_section(info_table, "📄 Document Information", "blue")
         
         # Pages results
         if 'pages' in result and result['pages'] is not None:
@@ -115,12 +291,13 @@ class OCRClient:
                 page_num = page.get('page_number', 'N/A')
                 page_proc_time = page.get('processing_time', 0)
                 proc_time = f"{page_proc_time:.2f}s" if page_proc_time is not None else "N/A"
-                text_preview = page.get('extracted_text', '')[:50] + "..." if len(page.get('extracted_text', '')) > 50 else page.get('extracted_text', '')
-                issues = str(len(page.get('issues_detected', [])))
+                text = page.get('extracted_text') or ''
+                text_preview = text[:50] + "..." if len(text) > 50 else text
+                issues = str(len(page.get('issues_detected') or []))
                 
                 pages_table.add_row(str(page_num), proc_time, text_preview, issues)
             
-            console.print(Panel(pages_table, title="📑 Page Results", border_style="green"))
+            print_section(pages_table, "📑 Page Results", "green")
         
         # Quality analysis
         if 'quality_analysis' in result and result['quality_analysis'] is not None:
@@ -138,7 +315,7 @@ class OCRClient:
             quality_table.add_row("Layout Score", f"{layout_score:.1f}/10" if layout_score is not None else "N/A")
             quality_table.add_row("Issues Found", str(len(qa.get('issues_detected', []))))
             
-            console.print(Panel(quality_table, title="🔍 Quality Analysis", border_style="yellow"))
+            print_section(quality_table, "🔍 Quality Analysis", "yellow")
         
         # Output files info
         if 'output_files' in result and result['output_files'] is not None:
@@ -147,7 +324,104 @@ class OCRClient:
                 f"📄 Processed PDF: {result['output_files'].get('processed_pdf', 'N/A')}",
                 f"📊 Analysis JSON: {result['output_files'].get('analysis_json', 'N/A')}"
             ])
-            console.print(Panel(output_info, title="💾 Output Files", border_style="magenta"))
+            print_section(output_info, "💾 Output Files", "magenta")
+
+class AsyncOCRClient:
+    """asyncio counterpart of OCRClient for event-driven callers - use as `async with AsyncOCRClient() as client`"""
+    
+    def __init__(self, base_url="http://localhost:8000", limit=32):
+        self.base_url = base_url.rstrip('/')
+        self.limit = limit
+        self.session = None
+    
+    async def __aenter__(self):
+        import aiohttp  # Only needed by asyncio callers, the CLI itself runs on requests
+        
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.limit, keepalive_timeout=75),
+            timeout=aiohttp.ClientTimeout(total=300)  # 5 minute timeout, as in OCRClient
+        )
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+    
+    async def _file_chunks(self, file_path):
+        """Stream a file without blocking the event loop on disk reads"""
+        loop = asyncio.get_running_loop()
+        with open(file_path, 'rb') as f:
+            # run_in_executor rather than asyncio.to_thread, which needs Python 3.9
+            while chunk := await loop.run_in_executor(None, f.read, UPLOAD_CHUNK_SIZE):
+                yield chunk
+    
+    async def wait_for_result(self, document_id):
+        """Poll a submitted document until it finishes, returning its result or None on failure"""
+        etag = None
+        delay = POLL_INITIAL_DELAY
+        deadline = time.monotonic() + PROCESSING_TIMEOUT
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            # Long-poll once we hold an ETag: the server holds the request until the status differs from it
+            async with self.session.get(
+                f"{self.base_url}/documents/status/{document_id}",
+                params={'wait': STATUS_LONG_POLL} if etag else None,
+                headers={'If-None-Match': etag} if etag else None
+            ) as response:
+                if response.status == 200:
+                    etag = response.headers.get('ETag')
+                    status = await response.json(loads=orjson.loads)
+                    if status["status"] == "completed":
+                        return status.get("result")
+                    if status["status"] == "failed":
+                        console.print(f"[red]Error: processing failed: {status.get('error', 'Unknown error')}[/red]")
+                        return None
+                elif response.status != 304:
+                    console.print(f"[red]Error: status check returned {response.status}[/red]")
+                    return None
+            # Servers without long-polling answer at once - back off instead of spinning
+            if time.monotonic() - started < 1:
+                await asyncio.sleep(delay)
+                delay = min(delay * POLL_BACKOFF, POLL_MAX_DELAY)
+        console.print(f"[red]Error: processing did not finish within {PROCESSING_TIMEOUT}s[/red]")
+        return None
+    
+    async def process_document(self, file_path, language="eng", enable_handwriting=False):
+        """Upload a PDF document and wait for the OCR API to finish processing it"""
+        import aiohttp
+        
+        error = pdf_file_error(file_path)
+        if error:
+            console.print(f"[red]Error: File '{file_path}' {error}[/red]")
+            return None
+        
+        data = aiohttp.FormData()
+        data.add_field('file', self._file_chunks(file_path),
+                       filename=os.path.basename(file_path), content_type='application/pdf')
+        data.add_field('language', language)
+        data.add_field('enable_handwriting_detection', str(enable_handwriting).lower())
+        
+        try:
+            async with self.session.post(f"{self.base_url}/documents/transform", data=data) as response:
+                if response.status != 200:
+                    console.print(f"[red]Error: API returned status {response.status}[/red]")
+                    console.print(f"[red]{await response.text()}[/red]")
+                    return None
+                submitted = await response.json(loads=orjson.loads)
+            # The upload returns at once; other documents upload and poll while this one waits
+            return await self.wait_for_result(submitted["document_id"])
+        except asyncio.TimeoutError:
+            console.print("[red]Error: Request timed out[/red]")
+            return None
+        except aiohttp.ClientError as e:
+            console.print(f"[red]Error: {str(e)}[/red]")
+            return None
+    
+    async def process_many(self, file_paths, language="eng", enable_handwriting=False):
+        """Upload and wait for several documents concurrently, returning results in input order"""
+        return await asyncio.gather(*(
+            self.process_document(file_path, language, enable_handwriting)
+            for file_path in file_paths
+        ))
 
 def main():
     parser = argparse.ArgumentParser(
@@ -173,16 +447,21 @@ Examples:
                        help='Output raw JSON results')
     parser.add_argument('--quiet', '-q', action='store_true',
                        help='Suppress progress output')
+    parser.add_argument('--workers', type=int, default=10,
+                       help='Number of files to upload concurrently (default: 10)')
+    parser.add_argument('--no-health-cache', action='store_true',
+                       help='Always check server health instead of reusing a check from the last 15 seconds')
     
     args = parser.parse_args()
     
     if args.quiet:
         console.quiet = True
     
-    client = OCRClient(args.url)
+    workers = max(1, args.workers)
+    client = OCRClient(args.url, pool_size=workers)
     
     # Check if server is running
-    if not client.check_server():
+    if not client.check_server(use_cache=not args.no_health_cache):
         console.print(f"[red]Error: OCR API server is not running at {args.url}[/red]")
         console.print("[yellow]Make sure to start the API server first:[/yellow]")
         console.print("[cyan]python api.py[/cyan]")
@@ -190,37 +469,48 @@ Examples:
     
     console.print(f"[green]✓ Connected to OCR API at {args.url}[/green]")
     
-    # Process files
-    for file_path in args.files:
-        # Handle glob patterns
-        if '*' in file_path:
-            import glob
-            matching_files = glob.glob(file_path)
-            if not matching_files:
-                console.print(f"[yellow]No files found matching pattern: {file_path}[/yellow]")
-                continue
-        else:
-            matching_files = [file_path]
-        
-        for file_to_process in matching_files:
-            console.print(f"\n[bold blue]Processing: {file_to_process}[/bold blue]")
-            
-            start_time = time.time()
-            result = client.process_document(
-                file_to_process, 
-                args.language, 
-                args.handwriting
-            )
-            end_time = time.time()
-            
-            if result:
-                if args.json:
-                    console.print(json.dumps(result, indent=2))
+    # Peek at the first two files to know whether this is a single-file run, then stream the rest
+    files = expand_paths(args.files)
+    head = list(itertools.islice(files, 2))
+    single_file = len(head) == 1
+    
+    def process(file_to_process):
+        start_time = time.time()
+        result = client.process_document(
+            file_to_process, 
+            args.language, 
+            args.handwriting,
+            show_progress=workers == 1 or single_file
+        )
+        return result, time.time() - start_time
+    
+    # Uploads are I/O-bound, so overlap them; results are displayed from this thread only.
+    # At most two uploads per worker are queued, refilled as they finish, so a large glob
+    # is consumed as it goes rather than read and queued in full up front
+    pending_files = itertools.chain(head, files)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        while True:
+            for f in itertools.islice(pending_files, workers * 2 - len(futures)):
+                futures[executor.submit(process, f)] = f
+            if not futures:
+                break
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                file_to_process = futures.pop(future)
+                result, elapsed = future.result()
+                console.print(f"\n[bold blue]Processed: {file_to_process}[/bold blue]")
+                
+                if result:
+                    if args.json:
+                        # Print verbatim: no markup parsing, highlighting or wrapping of long text lines
+                        console.print(orjson.dumps(result, option=orjson.OPT_INDENT_2).decode(),
+                                      markup=False, highlight=False, soft_wrap=True)
+                    else:
+                        client.display_results(result, file_to_process)
+                        console.print(f"[dim]Total time: {elapsed:.2f}s[/dim]")
                 else:
-                    client.display_results(result, file_to_process)
-                    console.print(f"[dim]Total time: {end_time - start_time:.2f}s[/dim]")
-            else:
-                console.print(f"[red]Failed to process {file_to_process}[/red]")
+                    console.print(f"[red]Failed to process {file_to_process}[/red]")
 
 if __name__ == "__main__":
     try:
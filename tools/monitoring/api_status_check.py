@@ -5,21 +5,54 @@ Quick API Status Check Script
 This script provides a quick overview of the OCR API status and performance.
 """
 
+import orjson
 import requests
 import json
 import time
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Shared across checks so --watch reuses one keep-alive connection instead of reconnecting every 5 seconds
+_SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504], allowed_methods=["GET"])
+)
+_SESSION.mount("http://", _adapter)
+_SESSION.mount("https://", _adapter)
+_SESSION.headers.update({"Connection": "keep-alive", "Accept": "application/json"})
+
+# (connect, read) timeouts in seconds
+REQUEST_TIMEOUT = (3.05, 27)
+
+# Last API info body and ETag per base URL - the info is revalidated with If-None-Match
+# rather than downloaded again on every --watch check
+_info_cache = {}
 
 def check_api_status(base_url="http://localhost:8000"):
     """Check API status and return summary"""
     try:
         # Health check
-        health_response = requests.get(f"{base_url}/health", timeout=5)
-        health_data = health_response.json() if health_response.status_code == 200 else None
+        health_response = _SESSION.get(f"{base_url}/health", timeout=REQUEST_TIMEOUT)
+        health_data = orjson.loads(health_response.content) if health_response.status_code == 200 else None
         
         # API info
-        info_response = requests.get(f"{base_url}/", timeout=5)
-        info_data = info_response.json() if info_response.status_code == 200 else None
+        cached = _info_cache.get(base_url)
+        info_response = _SESSION.get(
+            f"{base_url}/",
+            headers={"If-None-Match": cached[0]} if cached else None,
+            timeout=REQUEST_TIMEOUT
+        )
+        if info_response.status_code == 304 and cached:
+            info_data = cached[1]
+        elif info_response.status_code == 200:
+            info_data = orjson.loads(info_response.content)
+            if "ETag" in info_response.headers:
+                _info_cache[base_url] = (info_response.headers["ETag"], info_data)
+        else:
+            info_data = None
         
         return {
             "status": "healthy" if health_data else "unhealthy",
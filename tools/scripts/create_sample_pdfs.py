@@ -2,17 +2,19 @@
 """
 Script to create sample PDF files for testing the OCR API.
 This creates simple PDF files with text content for testing purposes.
+Samples that already exist are reused; pass --force to regenerate them.
 """
 
 import os
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.lib.units import inch
+import sys
 
-def create_sample_pdf(filename, content, page_size=A4):
+def create_sample_pdf(filename, content, page_size=None):
     """Create a PDF file with the given content."""
+    # Imported lazily - reportlab start-up dominates the run and is skipped when samples exist
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import A4
+
+    page_size = page_size or A4
     c = canvas.Canvas(filename, pagesize=page_size)
     width, height = page_size
     
@@ -220,11 +222,16 @@ Finance Department
 Phòng Tài chính
 Date: January 10, 2024"""
     
-    # Create the PDF files
-    create_sample_pdf(os.path.join(samples_dir, "1.pdf"), vietnamese_content)
-    create_sample_pdf(os.path.join(samples_dir, "2.pdf"), english_content)
-    create_sample_pdf(os.path.join(samples_dir, "3.pdf"), mixed_content)
-    create_sample_pdf(os.path.join(samples_dir, "4.pdf"), table_content)
+    # Create the PDF files, reusing samples generated by an earlier run
+    force = "--force" in sys.argv
+    for i, content in enumerate(
+        [vietnamese_content, english_content, mixed_content, table_content], 1
+    ):
+        filepath = os.path.join(samples_dir, f"{i}.pdf")
+        if not force and os.path.exists(filepath):
+            print(f"Reusing {filepath}")
+            continue
+        create_sample_pdf(filepath, content)
     
     print(f"\nCreated 4 sample PDF files in {samples_dir}/ directory")
     print("Files created:")